@@ -7,9 +7,20 @@ import os
 import sys
 import time
 import requests
-import json
+from requests.adapters import HTTPAdapter
+import orjson
 from datetime import datetime
 
+# Format d'horodatage des messages
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Session HTTP partagée (keep-alive) pour éviter une connexion par requête
+SESSION = requests.Session()
+SESSION.headers.update({"Connection": "keep-alive"})
+_adapter = HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=0)
+SESSION.mount("http://", _adapter)
+SESSION.mount("https://", _adapter)
+
 def demo_health_checks():
     """Démonstration des health checks."""
     print("🔍 DÉMONSTRATION - HEALTH CHECKS")
@@ -21,9 +32,9 @@ def demo_health_checks():
     print("\n1. Health Check Live:")
     print("   URL: GET /health/live/")
     try:
-        response = requests.get(f"{base_url}/health/live/")
+        response = SESSION.get(f"{base_url}/health/live/")
         print(f"   Status: {response.status_code}")
-        print(f"   Response: {response.json()}")
+        print(f"   Response: {orjson.loads(response.content)}")
     except Exception as e:
         print(f"   Erreur: {e}")
     
@@ -31,9 +42,9 @@ def demo_health_checks():
     print("\n2. Health Check Ready:")
     print("   URL: GET /health/ready/")
     try:
-        response = requests.get(f"{base_url}/health/ready/")
+        response = SESSION.get(f"{base_url}/health/ready/")
         print(f"   Status: {response.status_code}")
-        data = response.json()
+        data = orjson.loads(response.content)
         print(f"   Service: {data.get('service')}")
         print(f"   Status: {data.get('status')}")
         print(f"   Checks: {data.get('checks')}")
@@ -44,9 +55,9 @@ def demo_health_checks():
     print("\n3. Health Check Detailed:")
     print("   URL: GET /health/detailed/")
     try:
-        response = requests.get(f"{base_url}/health/detailed/")
+        response = SESSION.get(f"{base_url}/health/detailed/")
         print(f"   Status: {response.status_code}")
-        data = response.json()
+        data = orjson.loads(response.content)
         print(f"   Metrics: {list(data.get('metrics', {}).keys())}")
     except Exception as e:
         print(f"   Erreur: {e}")
@@ -56,11 +67,12 @@ def demo_celery_status():
     print("\n🔧 DÉMONSTRATION - CELERY STATUS")
     print("=" * 50)
     
+    print("\nLe worker tourne avec: celery -A smartmarket worker -Ofair --prefetch-multiplier=1")
     print("\nCommandes à exécuter dans le terminal:")
     print("1. docker-compose -f docker-compose.prod.yaml exec worker celery -A smartmarket inspect ping")
     print("2. docker-compose -f docker-compose.prod.yaml exec worker celery -A smartmarket inspect active")
     print("3. docker-compose -f docker-compose.prod.yaml exec beat celery -A smartmarket inspect scheduled")
-    print("4. docker-compose -f docker-compose.prod.yaml exec worker celery -A smartmarket inspect stats")
+    print("4. docker-compose -f docker-compose.prod.yaml exec worker celery -A smartmarket inspect stats  # vérifier pool.max-concurrency / prefetch_count")
 
 def demo_websocket_notifications():
     """Démonstration des notifications WebSocket."""
@@ -138,15 +150,16 @@ def main():
     """Fonction principale de démonstration."""
     print("🎬 DÉMONSTRATION JOUR 4 - SMARTMARKET")
     print("=" * 60)
-    print(f"🕐 Début: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"🕐 Début: {datetime.now():{TIME_FORMAT}}")
     
     # Démonstrations
-    demo_health_checks()
-    demo_celery_status()
-    demo_websocket_notifications()
-    demo_backup_restore()
-    demo_docker_services()
-    demo_ci_cd()
+    with SESSION:
+        demo_health_checks()
+        demo_celery_status()
+        demo_websocket_notifications()
+        demo_backup_restore()
+        demo_docker_services()
+        demo_ci_cd()
     
     print("\n" + "=" * 60)
     print("🎉 Démonstration terminée!")
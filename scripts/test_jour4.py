@@ -4,25 +4,77 @@ Script de test pour les fonctionnalités du Jour 4.
 """
 
 import os
+import ssl
 import sys
-import time
-import requests
-import json
-import websocket
-import threading
+import httpx
+import orjson
+import asyncio
+import websockets
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from urllib.parse import urlsplit
+
+# Format d'horodatage des messages
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
 
 # Configuration
-BASE_URL = "http://localhost:8000"
-WS_URL = "ws://localhost:8000/ws/admin/orders/"
+# Pointer vers nginx (https://localhost) pour bénéficier du multiplexage HTTP/2
+BASE_URL = os.environ.get("SMARTMARKET_BASE_URL", "http://localhost:8000")
+_BASE = urlsplit(BASE_URL)
+WS_URL = f"{'wss' if _BASE.scheme == 'https' else 'ws'}://{_BASE.netloc}/ws/admin/orders/"
+WS_CONNECTIONS = 50  # Connexions WebSocket ouvertes simultanément
+WS_TIMEOUT = 5  # secondes
+
+# Certificat TLS vérifié sauf en local (auto-signé) ou si SMARTMARKET_INSECURE=1
+VERIFY_TLS = not (
+    _BASE.hostname in ("localhost", "127.0.0.1", "::1")
+    or os.environ.get("SMARTMARKET_INSECURE") == "1"
+)
+
+# Client HTTP partagé : HTTP/2 (multiplexage sur une seule connexion) si le serveur le négocie,
+# sinon keep-alive HTTP/1.1
+CLIENT = httpx.Client(
+    http2=True,
+    timeout=10.0,
+    verify=VERIFY_TLS,
+    limits=httpx.Limits(max_keepalive_connections=20),
+)
+
+# Nombre maximal de sondes HTTP exécutées en parallèle
+MAX_WORKERS = 8
+
+def _probe(endpoint):
+    """Effectue un GET sur un endpoint et retourne (endpoint, réponse)."""
+    return endpoint, CLIENT.get(f"{BASE_URL}{endpoint}")
+
+def _check_endpoints(executor, endpoints, ok_status_codes):
+    """Sonde les endpoints en parallèle et affiche les résultats à mesure qu'ils arrivent."""
+    futures = {executor.submit(_probe, endpoint): endpoint for endpoint in endpoints}
+    
+    for future in as_completed(futures):
+        endpoint = futures[future]
+        error = future.exception()
+        if error is not None:
+            print(f"❌ {endpoint}: {error}")
+            continue
+        
+        _, response = future.result()
+        if response.status_code in ok_status_codes:
+            print(f"✅ {endpoint}: {response.status_code}")
+        else:
+            print(f"❌ {endpoint}: {response.status_code}")
 
-def test_health_checks():
+def test_health_checks(executor):
     """Test des health checks."""
     print("🔍 Test des health checks...")
     
+    # Lancer les deux sondes en parallèle
+    live_future = executor.submit(_probe, "/health/live/")
+    ready_future = executor.submit(_probe, "/health/ready/")
+    
     # Test health live
     try:
-        response = requests.get(f"{BASE_URL}/health/live/", timeout=10)
+        _, response = live_future.result()
         if response.status_code == 200:
             print("✅ Health live: OK")
         else:
@@ -32,9 +84,9 @@ def test_health_checks():
     
     # Test health ready
     try:
-        response = requests.get(f"{BASE_URL}/health/ready/", timeout=10)
+        _, response = ready_future.result()
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             print("✅ Health ready: OK")
             print(f"   - Database: {data.get('checks', {}).get('database', 'Unknown')}")
             print(f"   - Redis: {data.get('checks', {}).get('redis', 'Unknown')}")
@@ -50,7 +102,7 @@ def test_celery_tasks():
     
     # Test de la tâche de debug
     try:
-        response = requests.post(f"{BASE_URL}/api/v1/test-celery/", timeout=30)
+        response = CLIENT.post(f"{BASE_URL}/api/v1/test-celery/", timeout=30.0)
         if response.status_code == 200:
             print("✅ Tâche Celery: OK")
         else:
@@ -58,56 +110,48 @@ def test_celery_tasks():
     except Exception as e:
         print(f"❌ Tâche Celery: {e}")
 
+async def _websocket_probe():
+    """Ouvre une connexion WebSocket, envoie un ping et attend la réponse."""
+    options = {}
+    if WS_URL.startswith("wss://") and not VERIFY_TLS:
+        options["ssl"] = ssl.create_default_context()
+        options["ssl"].check_hostname = False
+        options["ssl"].verify_mode = ssl.CERT_NONE
+    
+    async with websockets.connect(WS_URL, **options) as ws:
+        await ws.send(orjson.dumps({"type": "ping"}).decode())
+        return orjson.loads(await asyncio.wait_for(ws.recv(), WS_TIMEOUT))
+
+async def _run_websocket_probes(count):
+    """Lance `count` connexions WebSocket en parallèle dans la même boucle."""
+    return await asyncio.gather(
+        *[_websocket_probe() for _ in range(count)],
+        return_exceptions=True
+    )
+
 def test_websocket_connection():
     """Test de la connexion WebSocket."""
-    print("\n🌐 Test de la connexion WebSocket...")
-    
-    messages_received = []
-    
-    def on_message(ws, message):
-        messages_received.append(json.loads(message))
-        print(f"📨 Message reçu: {message[:100]}...")
-    
-    def on_error(ws, error):
-        print(f"❌ Erreur WebSocket: {error}")
-    
-    def on_close(ws, close_status_code, close_msg):
-        print("🔌 Connexion WebSocket fermée")
-    
-    def on_open(ws):
-        print("✅ Connexion WebSocket établie")
-        # Envoyer un ping
-        ws.send(json.dumps({"type": "ping"}))
+    print(f"\n🌐 Test de {WS_CONNECTIONS} connexions WebSocket simultanées...")
     
     try:
-        ws = websocket.WebSocketApp(
-            WS_URL,
-            on_open=on_open,
-            on_message=on_message,
-            on_error=on_error,
-            on_close=on_close
-        )
-        
-        # Lancer la connexion dans un thread
-        ws_thread = threading.Thread(target=ws.run_forever)
-        ws_thread.daemon = True
-        ws_thread.start()
-        
-        # Attendre un peu pour recevoir des messages
-        time.sleep(5)
-        
-        # Fermer la connexion
-        ws.close()
-        
-        if messages_received:
-            print(f"✅ WebSocket: {len(messages_received)} messages reçus")
-        else:
-            print("⚠️ WebSocket: Aucun message reçu")
-            
+        results = asyncio.run(_run_websocket_probes(WS_CONNECTIONS))
     except Exception as e:
         print(f"❌ WebSocket: {e}")
+        return
+    
+    messages_received = [r for r in results if not isinstance(r, Exception)]
+    errors = [r for r in results if isinstance(r, Exception)]
+    
+    if messages_received:
+        print(f"📨 Message reçu: {orjson.dumps(messages_received[0]).decode()[:100]}...")
+        print(f"✅ WebSocket: {len(messages_received)}/{WS_CONNECTIONS} connexions ont répondu")
+    else:
+        print("⚠️ WebSocket: Aucun message reçu")
+    
+    if errors:
+        print(f"❌ WebSocket: {len(errors)} erreur(s), ex: {errors[0]!r}")
 
-def test_api_endpoints():
+def test_api_endpoints(executor):
     """Test des endpoints API."""
     print("\n🔗 Test des endpoints API...")
     
@@ -118,22 +162,15 @@ def test_api_endpoints():
         "/health/ready/",
     ]
     
-    for endpoint in endpoints:
-        try:
-            response = requests.get(f"{BASE_URL}{endpoint}", timeout=10)
-            if response.status_code in [200, 401, 403]:  # 401/403 sont OK pour les endpoints protégés
-                print(f"✅ {endpoint}: {response.status_code}")
-            else:
-                print(f"❌ {endpoint}: {response.status_code}")
-        except Exception as e:
-            print(f"❌ {endpoint}: {e}")
+    # 401/403 sont OK pour les endpoints protégés
+    _check_endpoints(executor, endpoints, [200, 401, 403])
 
 def test_admin_dashboard():
     """Test du tableau de bord admin."""
     print("\n📊 Test du tableau de bord admin...")
     
     try:
-        response = requests.get(f"{BASE_URL}/admin/dashboard/", timeout=10)
+        response = CLIENT.get(f"{BASE_URL}/admin/dashboard/")
         if response.status_code in [200, 302]:  # 302 = redirection vers login
             print("✅ Tableau de bord admin: Accessible")
         else:
@@ -141,7 +178,7 @@ def test_admin_dashboard():
     except Exception as e:
         print(f"❌ Tableau de bord admin: {e}")
 
-def test_ml_endpoints():
+def test_ml_endpoints(executor):
     """Test des endpoints ML."""
     print("\n🤖 Test des endpoints ML...")
     
@@ -149,35 +186,28 @@ def test_ml_endpoints():
         "/api/v1/ml/status/",
     ]
     
-    for endpoint in ml_endpoints:
-        try:
-            response = requests.get(f"{BASE_URL}{endpoint}", timeout=10)
-            if response.status_code in [200, 401, 403]:
-                print(f"✅ {endpoint}: {response.status_code}")
-            else:
-                print(f"❌ {endpoint}: {response.status_code}")
-        except Exception as e:
-            print(f"❌ {endpoint}: {e}")
+    _check_endpoints(executor, ml_endpoints, [200, 401, 403])
 
 def main():
     """Fonction principale de test."""
     print("🧪 TEST DES FONCTIONNALITÉS JOUR 4 - SMARTMARKET")
     print("=" * 60)
-    print(f"🕐 Début des tests: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"🕐 Début des tests: {datetime.now():{TIME_FORMAT}}")
     print(f"🌐 URL de base: {BASE_URL}")
     print()
     
     # Tests
-    test_health_checks()
-    test_api_endpoints()
-    test_ml_endpoints()
-    test_admin_dashboard()
-    test_websocket_connection()
-    test_celery_tasks()
+    with CLIENT, ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        test_health_checks(executor)
+        test_api_endpoints(executor)
+        test_ml_endpoints(executor)
+        test_admin_dashboard()
+        test_websocket_connection()
+        test_celery_tasks()
     
     print("\n" + "=" * 60)
     print("🎉 Tests terminés!")
-    print(f"🕐 Fin des tests: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"🕐 Fin des tests: {datetime.now():{TIME_FORMAT}}")
     
     print("\n📋 Instructions pour les tests manuels:")
     print("1. Ouvrir http://localhost:8000/admin/dashboard/ dans un navigateur")
@@ -3,6 +3,7 @@ Configuration de l'administration Django pour l'application catalog.
 """
 
 from django.contrib import admin
+from django.db.models import Count
 from django.utils.html import format_html
 
 from .models import Category, Product
@@ -18,11 +19,16 @@ class CategoryAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("name",)}
     readonly_fields = ["created_at", "updated_at"]
 
+    def get_queryset(self, request):
+        """Annote le nombre de produits pour éviter une requête par ligne."""
+        return super().get_queryset(request).annotate(_product_count=Count("products"))
+
     def product_count(self, obj):
         """Affiche le nombre de produits dans cette catégorie."""
-        return obj.products.count()
+        return obj._product_count
 
     product_count.short_description = "Nombre de produits"
+    product_count.admin_order_field = "_product_count"
 
 
 @admin.register(Product)
@@ -4,11 +4,26 @@ Vues d'administration pour SmartMarket.
 
 from django.shortcuts import render
 from django.contrib.admin.views.decorators import staff_member_required
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.core.cache import cache
+from django.db.models import Count, Prefetch, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from datetime import timedelta
 
-from .models import Order, User, Product
+import orjson
+
+from .models import Order, OrderItem, User, Product
+
+# Cache des statistiques du tableau de bord
+ADMIN_STATS_CACHE_KEY = 'admin:stats:v1'
+ADMIN_STATS_CACHE_TTL = 15  # secondes
+
+# Taille de page de admin_orders_api (bornée)
+ORDERS_MAX_PER_PAGE = 100
+
+# Statuts de commande, calculés une seule fois à l'import
+STATUS_KEYS = tuple(status for status, _ in Order.STATUS_CHOICES)
 
 
 @staff_member_required
@@ -19,51 +34,82 @@ def admin_dashboard(request):
     return render(request, 'admin/dashboard.html')
 
 
+def compute_admin_stats():
+    """
+    Calcule les statistiques du tableau de bord d'administration.
+    
+    Returns:
+        Dictionnaire sérialisable en JSON
+    """
+    now = timezone.now()
+    today = now.date()
+    week_days = [today - timedelta(days=i) for i in range(7)]
+    
+    # Toutes les statistiques de commandes en une seule requête (agrégats conditionnels)
+    order_stats = Order.objects.aggregate(
+        total=Count('id'),
+        **{
+            f'status_{status}': Count('id', filter=Q(status=status))
+            for status in STATUS_KEYS
+        },
+        **{
+            f'day_{i}': Count('id', filter=Q(created_at__date=date))
+            for i, date in enumerate(week_days)
+        },
+    )
+    total_orders = order_stats['total']
+    today_orders = order_stats['day_0']
+    
+    # Utilisateurs actifs (dernière connexion dans les 7 derniers jours)
+    week_ago = now - timedelta(days=7)
+    active_users = User.objects.filter(
+        last_login__gte=week_ago
+    ).count()
+    
+    # Produits actifs
+    active_products = Product.objects.filter(is_active=True).count()
+    
+    # Commandes par statut
+    orders_by_status = {
+        status: order_stats[f'status_{status}']
+        for status in STATUS_KEYS
+    }
+    
+    # Commandes des 7 derniers jours
+    week_orders = [
+        {
+            'date': date.isoformat(),
+            'count': order_stats[f'day_{i}']
+        }
+        for i, date in enumerate(week_days)
+    ]
+    
+    return {
+        'total_orders': total_orders,
+        'today_orders': today_orders,
+        'active_users': active_users,
+        'active_products': active_products,
+        'orders_by_status': orders_by_status,
+        'week_orders': week_orders,
+        'timestamp': now.isoformat()
+    }
+
+
 @staff_member_required
 def admin_stats_api(request):
     """
     API pour les statistiques d'administration.
+    
+    Les statistiques sont servies depuis le cache, rafraîchi périodiquement
+    par la tâche Celery refresh_admin_stats.
     """
     try:
-        # Statistiques générales
-        total_orders = Order.objects.count()
-        today_orders = Order.objects.filter(
-            created_at__date=timezone.now().date()
-        ).count()
-        
-        # Utilisateurs actifs (dernière connexion dans les 7 derniers jours)
-        week_ago = timezone.now() - timedelta(days=7)
-        active_users = User.objects.filter(
-            last_login__gte=week_ago
-        ).count()
+        stats = cache.get(ADMIN_STATS_CACHE_KEY)
+        if stats is None:
+            stats = compute_admin_stats()
+            cache.set(ADMIN_STATS_CACHE_KEY, stats, ADMIN_STATS_CACHE_TTL)
         
-        # Produits actifs
-        active_products = Product.objects.filter(is_active=True).count()
-        
-        # Commandes par statut
-        orders_by_status = {}
-        for status, _ in Order.STATUS_CHOICES:
-            orders_by_status[status] = Order.objects.filter(status=status).count()
-        
-        # Commandes des 7 derniers jours
-        week_orders = []
-        for i in range(7):
-            date = timezone.now().date() - timedelta(days=i)
-            count = Order.objects.filter(created_at__date=date).count()
-            week_orders.append({
-                'date': date.isoformat(),
-                'count': count
-            })
-        
-        return JsonResponse({
-            'total_orders': total_orders,
-            'today_orders': today_orders,
-            'active_users': active_users,
-            'active_products': active_products,
-            'orders_by_status': orders_by_status,
-            'week_orders': week_orders,
-            'timestamp': timezone.now().isoformat()
-        })
+        return JsonResponse(stats)
         
     except Exception as e:
         return JsonResponse({
@@ -77,17 +123,21 @@ def admin_orders_api(request):
     API pour les commandes d'administration.
     """
     try:
+        now_iso = timezone.now().isoformat()
+        
         # Paramètres de pagination
-        page = int(request.GET.get('page', 1))
-        per_page = int(request.GET.get('per_page', 20))
-        offset = (page - 1) * per_page
+        per_page = min(max(int(request.GET.get('per_page', 20)), 1), ORDERS_MAX_PER_PAGE)
+        cursor = request.GET.get('cursor')
+        exact_count = request.GET.get('exact_count') == '1'
         
         # Filtres
         status = request.GET.get('status')
         user_id = request.GET.get('user_id')
         
-        # Requête de base
-        orders_query = Order.objects.select_related('user', 'product').order_by('-created_at')
+        # Requête de base (ordre stable pour la pagination par curseur)
+        orders_query = Order.objects.select_related('user').prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product'))
+        ).order_by('-created_at', '-id')
         
         if status:
             orders_query = orders_query.filter(status=status)
@@ -96,44 +146,126 @@ def admin_orders_api(request):
             orders_query = orders_query.filter(user_id=user_id)
         
         # Pagination
-        total = orders_query.count()
-        orders = orders_query[offset:offset + per_page]
-        
-        # Formatage des données
-        orders_data = []
-        for order in orders:
-            orders_data.append({
-                'id': order.id,
-                'user': {
-                    'id': order.user.id,
-                    'username': order.user.username,
-                    'email': order.user.email,
-                },
-                'product': {
-                    'id': order.product.id,
-                    'name': order.product.name,
-                    'price': str(order.product.price),
-                },
-                'quantity': order.quantity,
-                'total_price': str(order.total_price),
-                'status': order.status,
-                'created_at': order.created_at.isoformat(),
-                'updated_at': order.updated_at.isoformat(),
-            })
-        
-        return JsonResponse({
-            'orders': orders_data,
-            'pagination': {
+        if exact_count:
+            # Ancien comportement : OFFSET + COUNT(*) pour connaître le total
+            page = max(int(request.GET.get('page', 1)), 1)
+            offset = (page - 1) * per_page
+            total = orders_query.count()
+            pagination = {
                 'page': page,
                 'per_page': per_page,
                 'total': total,
                 'pages': (total + per_page - 1) // per_page
-            },
-            'timestamp': timezone.now().isoformat()
-        })
+            }
+            orders_query = orders_query[offset:offset + per_page]
+        else:
+            # Pagination par curseur "<created_at ISO>_<id>" : une seule requête LIMIT indexée
+            if cursor:
+                cursor_created_at, cursor_id = _parse_orders_cursor(cursor)
+                if cursor_created_at is None:
+                    return JsonResponse({
+                        'error': 'Curseur invalide'
+                    }, status=400)
+                orders_query = orders_query.filter(
+                    Q(created_at__lt=cursor_created_at) |
+                    Q(created_at=cursor_created_at, id__lt=cursor_id)
+                )
+            
+            # Une ligne de plus pour savoir s'il existe une page suivante
+            pagination = None
+            orders_query = orders_query[:per_page + 1]
+        
+        # Page bornée (per_page + 1 lignes) : évaluée ici pour que les erreurs
+        # de requête passent par le 500 ci-dessous et non par un flux tronqué
+        orders = list(orders_query)
+        
+        return StreamingHttpResponse(
+            _stream_orders(orders, per_page, cursor, pagination, now_iso),
+            content_type='application/json'
+        )
         
     except Exception as e:
         return JsonResponse({
             'error': str(e)
         }, status=500)
 
+
+def _serialize_order(order):
+    """Sérialise une commande pour l'API d'administration."""
+    return orjson.dumps({
+        'id': order.id,
+        'user': {
+            'id': order.user.id,
+            'username': order.user.username,
+            'email': order.user.email,
+        },
+        'items': [
+            {
+                'product': {
+                    'id': item.product.id,
+                    'name': item.product.name,
+                    'price': str(item.product.price),
+                },
+                'quantity': item.quantity,
+                'unit_price': str(item.unit_price),
+            }
+            for item in order.items.all()
+        ],
+        'total_price': str(order.total_amount),
+        'status': order.status,
+        'created_at': order.created_at.isoformat(),
+        'updated_at': order.updated_at.isoformat(),
+    })
+
+
+def _stream_orders(orders, per_page, cursor, pagination, now_iso):
+    """
+    Génère la réponse JSON de admin_orders_api commande par commande.
+    
+    Si pagination vaut None (mode curseur), elle est calculée à la volée :
+    la page contient une ligne de plus que per_page pour détecter la page suivante.
+    """
+    yield b'{"orders":['
+    
+    emitted = 0
+    last_order = None
+    has_next = False
+    for order in orders:
+        if emitted == per_page:
+            has_next = True
+            break
+        yield (b',' if emitted else b'') + _serialize_order(order)
+        emitted += 1
+        last_order = order
+    
+    if pagination is None:
+        next_cursor = None
+        if has_next and last_order is not None:
+            next_cursor = f"{last_order.created_at.isoformat()}_{last_order.id}"
+        pagination = {
+            'per_page': per_page,
+            'cursor': cursor,
+            'next_cursor': next_cursor,
+            'has_next': has_next,
+        }
+    
+    yield b'],"pagination":' + orjson.dumps(pagination)
+    yield b',"timestamp":' + orjson.dumps(now_iso) + b'}'
+
+
+def _parse_orders_cursor(cursor):
+    """
+    Décode un curseur de pagination "<created_at ISO>_<id>".
+    
+    Retourne (None, None) si le curseur est invalide.
+    """
+    created_at_str, _, id_str = cursor.rpartition('_')
+    try:
+        # Le "+" du fuseau horaire devient un espace s'il n'est pas encodé dans l'URL
+        created_at = parse_datetime(created_at_str.replace(' ', '+'))
+    except ValueError:
+        # Format reconnu mais date impossible (mois 13...)
+        return None, None
+    if created_at is None or not id_str.isdigit():
+        return None, None
+    return created_at, int(id_str)
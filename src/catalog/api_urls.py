@@ -2,6 +2,7 @@
 URLs pour l'API REST.
 """
 
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
@@ -10,6 +11,7 @@ from .ml_views import (
     product_recommendations,
     semantic_search,
     rag_assistant,
+    rag_assistant_async,
     ml_status
 )
 
@@ -27,6 +29,10 @@ urlpatterns = [
     # Endpoints ML
     path('products/<int:product_id>/recommendations/', product_recommendations, name='product_recommendations'),
     path('search/', semantic_search, name='semantic_search'),
-    path('assistant/ask/', rag_assistant, name='rag_assistant'),
+    path(
+        'assistant/ask/',
+        rag_assistant_async if settings.ML_RAG_ASYNC else rag_assistant,
+        name='rag_assistant'
+    ),
     path('ml/status/', ml_status, name='ml_status'),
 ]
@@ -107,15 +107,40 @@ class OrderViewSet(viewsets.ModelViewSet):
             return OrderUpdateSerializer
         return OrderDetailSerializer
     
+    # Colonnes nécessaires à OrderListSerializer (les autres sont différées)
+    LIST_ONLY_FIELDS = (
+        'id', 'status', 'total_amount', 'shipping_address',
+        'created_at', 'updated_at',
+        'user__id', 'user__username', 'user__email',
+        'user__first_name', 'user__last_name', 'user__phone',
+        'user__address', 'user__is_gdpr_consent', 'user__gdpr_consent_date',
+        'user__date_joined', 'user__last_login',
+    )
+    
     def get_queryset(self):
         """Retourne le queryset approprié selon les permissions."""
-        queryset = Order.objects.select_related('user').prefetch_related('items__product')
+        # Chargement anticipé décrit par le serializer de l'action (setup_eager_loading)
+        queryset = Order.objects.all()
+        serializer_class = self.get_serializer_class()
+        if hasattr(serializer_class, 'setup_eager_loading'):
+            queryset = serializer_class.setup_eager_loading(queryset)
         
-        if not self.request.user.is_staff and not self.request.user.groups.filter(name='manager').exists():
+        if self.action == 'list':
+            # La liste n'affiche que le nombre d'éléments : pas besoin des produits
+            queryset = queryset.only(*self.LIST_ONLY_FIELDS)
+        
+        if not self.request.user.is_staff and not self._is_manager():
             queryset = queryset.filter(user=self.request.user)
         
         return queryset
     
+    def _is_manager(self):
+        """Indique si l'utilisateur est manager (groupes mémorisés sur l'utilisateur)."""
+        return (
+            self.request.user.is_authenticated and
+            'manager' in self.request.user.group_names
+        )
+    
     def perform_create(self, serializer):
         """Crée une nouvelle commande."""
         serializer.save(user=self.request.user)
@@ -212,22 +237,20 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
             )
         
         with transaction.atomic():
-            user.is_active = False
-            user.save()
-            
-            orders = user.orders.all()
-            for order in orders:
-                order.shipping_address = "[SUPPRIMÉ]"
-                order.notes = "[SUPPRIMÉ]"
-                order.save()
+            user.orders.update(
+                shipping_address="[SUPPRIMÉ]",
+                notes="[SUPPRIMÉ]"
+            )
             
-            user.first_name = "[SUPPRIMÉ]"
-            user.last_name = "[SUPPRIMÉ]"
-            user.phone = ""
-            user.address = ""
-            user.email = f"deleted_{user.id}@example.com"
-            user.username = f"deleted_{user.id}"
-            user.save()
+            User.objects.filter(pk=user.pk).update(
+                is_active=False,
+                first_name="[SUPPRIMÉ]",
+                last_name="[SUPPRIMÉ]",
+                phone="",
+                address="",
+                email=f"deleted_{user.id}@example.com",
+                username=f"deleted_{user.id}"
+            )
         
         logger.info(
             f"Suppression RGPD effectuée pour l'utilisateur {user.id} par {request.user.email}",
@@ -1,10 +1,41 @@
+import os
+import sys
+
 from django.apps import AppConfig
 
 
+# Serveurs qui traitent des requêtes : seuls processus à précharger le ML
+# (workers/beat Celery, commandes de gestion et tests n'en ont pas besoin)
+ML_WARMUP_SERVERS = {'gunicorn', 'uvicorn', 'daphne'}
+
+
+def _should_warm_up_ml():
+    """Indique si le processus courant sert des requêtes (et doit précharger le ML)."""
+    program = os.path.basename(sys.argv[0]) if sys.argv else ''
+    if program == '__main__.py':
+        # python -m gunicorn : le nom du paquet est celui du dossier
+        program = os.path.basename(os.path.dirname(sys.argv[0]))
+    if program in ML_WARMUP_SERVERS:
+        return True
+    
+    if program in ('manage.py', 'django-admin') and sys.argv[1:2] == ['runserver']:
+        # Avec l'autoreloader, seul le processus enfant sert les requêtes
+        return '--noreload' in sys.argv or os.environ.get('RUN_MAIN') == 'true'
+    
+    return False
+
+
 class CatalogConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "catalog"
     
     def ready(self):
         """Importe les signaux lors du démarrage de l'application."""
-        import catalog.signals
\ No newline at end of file
+        import catalog.signals
+        
+        # Préchargement ML optionnel : évite aux tests et commandes de gestion
+        # de charger les modèles à chaque démarrage
+        from django.conf import settings
+        if getattr(settings, 'ML_WARMUP_ON_STARTUP', False) and _should_warm_up_ml():
+            from catalog.ml_views import warm_up_ml_services
+            warm_up_ml_services()
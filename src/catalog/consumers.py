@@ -2,19 +2,163 @@
 Consumers WebSocket pour SmartMarket.
 """
 
-import json
+import asyncio
 import logging
+from decimal import Decimal
+from urllib.parse import parse_qs
+
+import msgpack
+import orjson
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
+from django.utils import timezone
+
+from .models import Order
 
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
+# Cache de la liste JSON des commandes récentes (invalidé par les signaux Order)
+RECENT_ORDERS_CACHE_KEY = 'admin_orders:recent:v1'
+RECENT_ORDERS_CACHE_TTL = 3  # secondes
+
+
+def _default(obj):
+    """Types non gérés nativement par orjson."""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    raise TypeError
+
+
+def _dumps(obj):
+    """
+    Sérialise un message WebSocket avec orjson.
+    
+    Les trames restent textuelles : le tableau de bord fait JSON.parse(event.data).
+    """
+    return orjson.dumps(obj, default=_default).decode()
+
+
+def _packb(obj):
+    """Sérialise un message WebSocket en MessagePack (clients ?fmt=msgpack)."""
+    return msgpack.packb(obj, use_bin_type=True, datetime=True, default=_default)
+
+
+def _encode_frames(message):
+    """Encode un message dans les deux formats proposés aux clients."""
+    return {'frame': _dumps(message), 'frame_msgpack': _packb(message)}
+
+
+def serialize_frames(message_type, **fields):
+    """
+    Sérialise une trame WebSocket côté producteur.
+    
+    Le résultat est fusionné dans l'événement de groupe (clés 'frame' et
+    'frame_msgpack') : la trame est encodée une seule fois puis relayée telle
+    quelle par chaque consumer abonné, dans le format choisi par son client.
+    """
+    return _encode_frames({'type': message_type, **fields})
+
+
+# Trames statiques, sérialisées une seule fois
+PONG_FRAMES = _encode_frames({'type': 'pong'})
+INVALID_JSON_FRAMES = _encode_frames({'type': 'error', 'message': 'Invalid JSON'})
+
+
+# Fenêtre de regroupement des trames diffusées (secondes)
+WRITE_DELAY = 0.01
+
+
+class BatchedSendMixin:
+    """
+    Regroupe les trames diffusées qui arrivent dans la même fenêtre WRITE_DELAY.
+    
+    Une trame seule est envoyée telle quelle ; plusieurs trames partent dans
+    un seul message WebSocket contenant un tableau d'événements.
+    
+    Le client choisit le format à la connexion : JSON (trames texte, par défaut)
+    ou MessagePack avec ?fmt=msgpack (trames binaires).
+    """
+    
+    def start_flusher(self):
+        """Choisir le format de la connexion et démarrer la tâche d'envoi groupé."""
+        query = parse_qs(self.scope.get('query_string', b'').decode())
+        self.use_msgpack = query.get('fmt') == ['msgpack']
+        self._frame_key = 'frame_msgpack' if self.use_msgpack else 'frame'
+        
+        self._pending = []
+        self._has_pending = asyncio.Event()
+        self._flusher = asyncio.create_task(self._flush_loop())
+    
+    def stop_flusher(self):
+        """Arrêter la tâche d'envoi groupé (les trames en attente sont abandonnées)."""
+        flusher = getattr(self, '_flusher', None)
+        if flusher is not None:
+            flusher.cancel()
+            self._flusher = None
+    
+    def queue_frame(self, frames):
+        """Mettre une trame sérialisée (issue de serialize_frames) en attente d'envoi."""
+        self._pending.append(frames[self._frame_key])
+        self._has_pending.set()
+    
+    async def send_frames(self, frames):
+        """Envoyer immédiatement une trame pré-sérialisée dans le format du client."""
+        if self.use_msgpack:
+            await self.send(bytes_data=frames['frame_msgpack'])
+        else:
+            await self.send(text_data=frames['frame'])
+    
+    async def send_message(self, message):
+        """Sérialiser et envoyer immédiatement un message dans le format du client."""
+        if self.use_msgpack:
+            await self.send(bytes_data=_packb(message))
+        else:
+            await self.send(text_data=_dumps(message))
+    
+    def decode_message(self, text_data, bytes_data):
+        """
+        Décoder un message client (JSON en texte, MessagePack en binaire).
+        
+        Lève ValueError si le message est invalide ou n'est pas un objet :
+        orjson.JSONDecodeError et toutes les erreurs de msgpack.unpackb
+        (données tronquées, UTF-8 invalide, octets en trop) en héritent.
+        """
+        if bytes_data is not None:
+            data = msgpack.unpackb(bytes_data)
+        else:
+            data = orjson.loads(text_data)
+        
+        if not isinstance(data, dict):
+            raise ValueError("Message attendu : un objet")
+        return data
+    
+    async def _flush_loop(self):
+        """Vider le tampon WRITE_DELAY après l'arrivée de la première trame."""
+        while True:
+            await self._has_pending.wait()
+            await asyncio.sleep(WRITE_DELAY)
+            
+            frames, self._pending = self._pending, []
+            self._has_pending.clear()
+            
+            if len(frames) == 1:
+                if self.use_msgpack:
+                    await self.send(bytes_data=frames[0])
+                else:
+                    await self.send(text_data=frames[0])
+            elif self.use_msgpack:
+                header = msgpack.Packer().pack_array_header(len(frames))
+                await self.send(bytes_data=header + b''.join(frames))
+            else:
+                await self.send(text_data='[' + ','.join(frames) + ']')
+
 
-class AdminOrderConsumer(AsyncWebsocketConsumer):
+class AdminOrderConsumer(BatchedSendMixin, AsyncWebsocketConsumer):
     """Consumer pour les notifications de commandes en temps réel pour les admins."""
     
     async def connect(self):
@@ -22,10 +166,12 @@ class AdminOrderConsumer(AsyncWebsocketConsumer):
         self.room_group_name = 'admin_orders'
         
         # Vérifier l'authentification et les permissions
-        if not await self.check_admin_permissions():
+        if not self._is_admin():
             await self.close()
             return
         
+        self.start_flusher()
+        
         # Rejoindre le groupe
         await self.channel_layer.group_add(
             self.room_group_name,
@@ -36,14 +182,16 @@ class AdminOrderConsumer(AsyncWebsocketConsumer):
         logger.info(f"Admin connected to orders channel: {self.scope['user']}")
         
         # Envoyer un message de bienvenue
-        await self.send(text_data=json.dumps({
+        await self.send_message({
             'type': 'connection_established',
             'message': 'Connected to admin orders channel',
             'timestamp': self.get_timestamp()
-        }))
+        })
     
     async def disconnect(self, close_code):
         """Déconnexion WebSocket."""
+        self.stop_flusher()
+        
         # Quitter le groupe
         await self.channel_layer.group_discard(
             self.room_group_name,
@@ -51,50 +199,40 @@ class AdminOrderConsumer(AsyncWebsocketConsumer):
         )
         logger.info(f"Admin disconnected from orders channel: {close_code}")
     
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """Réception de messages du client."""
         try:
-            data = json.loads(text_data)
+            data = self.decode_message(text_data, bytes_data)
             message_type = data.get('type')
             
             if message_type == 'ping':
-                await self.send(text_data=json.dumps({
-                    'type': 'pong',
-                    'timestamp': self.get_timestamp()
-                }))
+                await self.send_frames(PONG_FRAMES)
             elif message_type == 'get_recent_orders':
                 await self.send_recent_orders()
             else:
-                await self.send(text_data=json.dumps({
+                await self.send_message({
                     'type': 'error',
                     'message': f'Unknown message type: {message_type}'
-                }))
+                })
                 
-        except json.JSONDecodeError:
-            await self.send(text_data=json.dumps({
-                'type': 'error',
-                'message': 'Invalid JSON'
-            }))
+        except ValueError:
+            await self.send_frames(INVALID_JSON_FRAMES)
     
     async def order_created(self, event):
         """Envoi d'une notification de nouvelle commande."""
-        await self.send(text_data=json.dumps({
-            'type': 'order_created',
-            'order': event['order'],
-            'timestamp': event['timestamp']
-        }))
+        self.queue_frame(event)
     
     async def order_updated(self, event):
         """Envoi d'une notification de commande mise à jour."""
-        await self.send(text_data=json.dumps({
-            'type': 'order_updated',
-            'order': event['order'],
-            'timestamp': event['timestamp']
-        }))
+        self.queue_frame(event)
     
-    @database_sync_to_async
-    def check_admin_permissions(self):
-        """Vérifier que l'utilisateur est un admin."""
+    def _is_admin(self):
+        """
+        Vérifier que l'utilisateur est un admin.
+        
+        L'utilisateur est déjà chargé dans le scope par AuthMiddlewareStack :
+        aucun accès à la base n'est nécessaire.
+        """
         user = self.scope.get('user')
         
         if not user or user.is_anonymous:
@@ -105,46 +243,60 @@ class AdminOrderConsumer(AsyncWebsocketConsumer):
     
     @database_sync_to_async
     def get_recent_orders(self):
-        """Récupérer les commandes récentes."""
-        from .models import Order
+        """
+        Récupérer les commandes récentes, déjà sérialisées en JSON.
         
-        orders = Order.objects.select_related('user', 'product').order_by('-created_at')[:10]
+        La liste est partagée entre tous les admins connectés via le cache.
+        """
+        payload = cache.get(RECENT_ORDERS_CACHE_KEY)
+        if payload is None:
+            payload = _dumps(self._build_recent_orders())
+            cache.set(RECENT_ORDERS_CACHE_KEY, payload, RECENT_ORDERS_CACHE_TTL)
+        return payload
+    
+    def _build_recent_orders(self):
+        """Construire la liste des commandes récentes depuis la base."""
+        # Uniquement les colonnes sérialisées, sans instancier de modèles
+        orders = Order.objects.order_by('-created_at').values(
+            'id', 'user__id', 'user__username', 'total_amount', 'status', 'created_at'
+        )[:10]
         
         return [
             {
-                'id': order.id,
+                'id': order['id'],
                 'user': {
-                    'id': order.user.id,
-                    'username': order.user.username,
-                },
-                'product': {
-                    'id': order.product.id,
-                    'name': order.product.name,
+                    'id': order['user__id'],
+                    'username': order['user__username'],
                 },
-                'quantity': order.quantity,
-                'total_price': str(order.total_price),
-                'status': order.status,
-                'created_at': order.created_at.isoformat(),
+                'total_price': order['total_amount'],
+                'status': order['status'],
+                'created_at': order['created_at'],
             }
             for order in orders
         ]
     
     async def send_recent_orders(self):
         """Envoyer les commandes récentes."""
-        orders = await self.get_recent_orders()
-        await self.send(text_data=json.dumps({
-            'type': 'recent_orders',
-            'orders': orders,
-            'timestamp': self.get_timestamp()
-        }))
+        orders_json = await self.get_recent_orders()
+        if self.use_msgpack:
+            await self.send_message({
+                'type': 'recent_orders',
+                'orders': orjson.loads(orders_json),
+                'timestamp': self.get_timestamp()
+            })
+            return
+        
+        await self.send(text_data=(
+            '{"type":"recent_orders","orders":' + orders_json
+            + ',"timestamp":' + _dumps(self.get_timestamp()) + '}'
+        ))
     
     def get_timestamp(self):
         """Obtenir le timestamp actuel."""
-        from django.utils import timezone
         return timezone.now().isoformat()
 
 
-class AdminNotificationConsumer(AsyncWebsocketConsumer):
+class AdminNotificationConsumer(BatchedSendMixin, AsyncWebsocketConsumer):
     """Consumer pour les notifications générales des admins."""
     
     async def connect(self):
@@ -152,10 +304,12 @@ class AdminNotificationConsumer(AsyncWebsocketConsumer):
         self.room_group_name = 'admin_notifications'
         
         # Vérifier l'authentification et les permissions
-        if not await self.check_admin_permissions():
+        if not self._is_admin():
             await self.close()
             return
         
+        self.start_flusher()
+        
         # Rejoindre le groupe
         await self.channel_layer.group_add(
             self.room_group_name,
@@ -167,48 +321,35 @@ class AdminNotificationConsumer(AsyncWebsocketConsumer):
     
     async def disconnect(self, close_code):
         """Déconnexion WebSocket."""
+        self.stop_flusher()
+        
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
         logger.info(f"Admin disconnected from notifications channel: {close_code}")
     
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """Réception de messages du client."""
         try:
-            data = json.loads(text_data)
+            data = self.decode_message(text_data, bytes_data)
             message_type = data.get('type')
             
             if message_type == 'ping':
-                await self.send(text_data=json.dumps({
-                    'type': 'pong',
-                    'timestamp': self.get_timestamp()
-                }))
+                await self.send_frames(PONG_FRAMES)
                 
-        except json.JSONDecodeError:
-            await self.send(text_data=json.dumps({
-                'type': 'error',
-                'message': 'Invalid JSON'
-            }))
+        except ValueError:
+            await self.send_frames(INVALID_JSON_FRAMES)
     
     async def system_notification(self, event):
         """Envoi d'une notification système."""
-        await self.send(text_data=json.dumps({
-            'type': 'system_notification',
-            'notification': event['notification'],
-            'timestamp': event['timestamp']
-        }))
+        self.queue_frame(event)
     
     async def ml_task_completed(self, event):
         """Envoi d'une notification de tâche ML terminée."""
-        await self.send(text_data=json.dumps({
-            'type': 'ml_task_completed',
-            'task': event['task'],
-            'timestamp': event['timestamp']
-        }))
+        self.queue_frame(event)
     
-    @database_sync_to_async
-    def check_admin_permissions(self):
+    def _is_admin(self):
         """Vérifier que l'utilisateur est un admin."""
         user = self.scope.get('user')
         
@@ -219,11 +360,10 @@ class AdminNotificationConsumer(AsyncWebsocketConsumer):
     
     def get_timestamp(self):
         """Obtenir le timestamp actuel."""
-        from django.utils import timezone
         return timezone.now().isoformat()
 
 
-class UserNotificationConsumer(AsyncWebsocketConsumer):
+class UserNotificationConsumer(BatchedSendMixin, AsyncWebsocketConsumer):
     """Consumer pour les notifications utilisateur."""
     
     async def connect(self):
@@ -232,10 +372,12 @@ class UserNotificationConsumer(AsyncWebsocketConsumer):
         self.room_group_name = f'user_{self.user_id}_notifications'
         
         # Vérifier l'authentification
-        if not await self.check_user_permissions():
+        if not self._is_notification_owner():
             await self.close()
             return
         
+        self.start_flusher()
+        
         # Rejoindre le groupe
         await self.channel_layer.group_add(
             self.room_group_name,
@@ -247,48 +389,35 @@ class UserNotificationConsumer(AsyncWebsocketConsumer):
     
     async def disconnect(self, close_code):
         """Déconnexion WebSocket."""
+        self.stop_flusher()
+        
         await self.channel_layer.group_discard(
             self.room_group_name,
             self.channel_name
         )
         logger.info(f"User {self.user_id} disconnected from notifications channel: {close_code}")
     
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """Réception de messages du client."""
         try:
-            data = json.loads(text_data)
+            data = self.decode_message(text_data, bytes_data)
             message_type = data.get('type')
             
             if message_type == 'ping':
-                await self.send(text_data=json.dumps({
-                    'type': 'pong',
-                    'timestamp': self.get_timestamp()
-                }))
+                await self.send_frames(PONG_FRAMES)
                 
-        except json.JSONDecodeError:
-            await self.send(text_data=json.dumps({
-                'type': 'error',
-                'message': 'Invalid JSON'
-            }))
+        except ValueError:
+            await self.send_frames(INVALID_JSON_FRAMES)
     
     async def user_notification(self, event):
         """Envoi d'une notification utilisateur."""
-        await self.send(text_data=json.dumps({
-            'type': 'user_notification',
-            'notification': event['notification'],
-            'timestamp': event['timestamp']
-        }))
+        self.queue_frame(event)
     
     async def order_status_update(self, event):
         """Envoi d'une notification de mise à jour de commande."""
-        await self.send(text_data=json.dumps({
-            'type': 'order_status_update',
-            'order': event['order'],
-            'timestamp': event['timestamp']
-        }))
+        self.queue_frame(event)
     
-    @database_sync_to_async
-    def check_user_permissions(self):
+    def _is_notification_owner(self):
         """Vérifier que l'utilisateur peut accéder à ses notifications."""
         user = self.scope.get('user')
         
@@ -296,10 +425,10 @@ class UserNotificationConsumer(AsyncWebsocketConsumer):
             return False
         
         # Vérifier que l'utilisateur accède à ses propres notifications
-        return str(user.id) == self.user_id
+        # (user_id est déjà converti en entier par la route)
+        return user.id == self.user_id
     
     def get_timestamp(self):
         """Obtenir le timestamp actuel."""
-        from django.utils import timezone
         return timezone.now().isoformat()
 
@@ -34,7 +34,12 @@ class ProductFilter(django_filters.FilterSet):
         return queryset
     
     def filter_search(self, queryset, name, value):
-        """Recherche dans le nom et la description des produits."""
+        """
+        Recherche dans le nom et la description des produits.
+        
+        Sous PostgreSQL, les ILIKE '%valeur%' sont servis par les index trigrammes
+        GIN de la migration 0004 au lieu d'un parcours complet de la table.
+        """
         if value:
             return queryset.filter(
                 Q(name__icontains=value) | 
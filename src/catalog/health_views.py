@@ -2,85 +2,110 @@
 Vues de health check pour SmartMarket.
 """
 
+import asyncio
 import time
 import logging
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.db import connection
 from django.core.cache import cache
 from django.conf import settings
 from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
+from asgiref.sync import sync_to_async
 
 logger = logging.getLogger(__name__)
 
 
+# Réponse de liveness pré-sérialisée (aucun accès DB/Redis)
+HEALTH_LIVE_BODY = b'{"status":"ok"}'
+HEALTH_LIVE_HEADERS = {'Cache-Control': 'max-age=0'}
+
+# Sondes de health_ready : (clé, libellé des messages d'erreur)
+READY_CHECKS = (
+    ('database', 'Database'),
+    ('redis', 'Redis'),
+    ('celery', 'Celery'),
+)
+
+# Métriques Celery de health_detailed
+CELERY_METRICS_CACHE_KEY = 'health:celery'
+CELERY_METRICS_CACHE_TTL = 10  # secondes
+
+# Version du serveur de base de données (ne change pas pendant la vie du processus)
+_database_version = None
+
+
 def health_live(request):
     """
     Health check simple - vérifie que l'application répond.
+    
+    Utilisé par les sondes Docker / load balancer : ne doit dépendre
+    d'aucun service externe.
     """
-    return JsonResponse({
-        'status': 'healthy',
-        'timestamp': time.time(),
-        'service': 'smartmarket-web'
-    })
+    # Un HttpResponse neuf par requête : les middlewares modifient ses en-têtes
+    return HttpResponse(
+        HEALTH_LIVE_BODY,
+        content_type='application/json',
+        headers=HEALTH_LIVE_HEADERS,
+    )
+
 
+def _check_database():
+    """Vérification de la base de données."""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+    return True
 
-def health_ready(request):
+
+def _check_redis():
+    """Vérification de Redis."""
+    cache.set('health_check', 'ok', 10)
+    return cache.get('health_check') == 'ok'
+
+
+def _check_celery():
+    """Vérification de Celery (optionnelle)."""
+    from celery import current_app
+    inspect = current_app.control.inspect()
+    return bool(inspect.stats())
+
+
+async def health_ready(request):
     """
     Health check complet - vérifie toutes les dépendances.
+    
+    Les sondes tournent en parallèle : la latence est celle de la plus lente
+    (en général inspect.stats() de Celery) et non leur somme.
     """
+    results = await asyncio.gather(
+        # La connexion DB est liée au thread : rester sur le thread principal
+        sync_to_async(_check_database)(),
+        sync_to_async(_check_redis, thread_sensitive=False)(),
+        sync_to_async(_check_celery, thread_sensitive=False)(),
+        return_exceptions=True,
+    )
+    
     checks = {
         'database': False,
         'redis': False,
-        'channels': False,
+        # Un group_send vers un groupe sans abonné ne prouve rien : on vérifie
+        # seulement que la couche Channels est configurée (Redis est sondé à part)
+        'channels': get_channel_layer() is not None,
         'celery': False,
     }
-    
     errors = []
     
-    # Vérification de la base de données
-    try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-        checks['database'] = True
-    except Exception as e:
-        errors.append(f"Database error: {str(e)}")
-        logger.error(f"Database health check failed: {e}")
-    
-    # Vérification de Redis
-    try:
-        cache.set('health_check', 'ok', 10)
-        if cache.get('health_check') == 'ok':
-            checks['redis'] = True
-    except Exception as e:
-        errors.append(f"Redis error: {str(e)}")
-        logger.error(f"Redis health check failed: {e}")
-    
-    # Vérification de Channels
-    try:
-        channel_layer = get_channel_layer()
-        if channel_layer:
-            # Test simple de connexion
-            async_to_sync(channel_layer.group_send)('health_check', {
-                'type': 'health_check',
-                'message': 'test'
-            })
-            checks['channels'] = True
-    except Exception as e:
-        errors.append(f"Channels error: {str(e)}")
-        logger.error(f"Channels health check failed: {e}")
-    
-    # Vérification de Celery (optionnelle)
-    try:
-        from celery import current_app
-        inspect = current_app.control.inspect()
-        stats = inspect.stats()
-        if stats:
-            checks['celery'] = True
-    except Exception as e:
-        # Celery peut ne pas être disponible, ce n'est pas critique
-        logger.warning(f"Celery health check failed: {e}")
+    for (name, label), result in zip(READY_CHECKS, results):
+        if isinstance(result, Exception):
+            checks[name] = False
+            if name == 'celery':
+                # Celery peut ne pas être disponible, ce n'est pas critique
+                logger.warning(f"Celery health check failed: {result}")
+            else:
+                errors.append(f"{label} error: {str(result)}")
+                logger.error(f"{label} health check failed: {result}")
+        else:
+            checks[name] = bool(result)
     
     # Déterminer le statut global
     critical_checks = ['database', 'redis']
@@ -106,6 +131,64 @@ def health_ready(request):
     return JsonResponse(response_data, status=status_code)
 
 
+def _get_database_version(cursor):
+    """Version du serveur de base de données, lue une fois par processus."""
+    global _database_version
+    if _database_version is None:
+        cursor.execute("SELECT version()")
+        _database_version = cursor.fetchone()[0]
+    return _database_version
+
+
+def _estimate_row_count(cursor, table):
+    """
+    Nombre de lignes d'une table.
+    
+    Sous PostgreSQL, lit l'estimation de pg_class.reltuples (tenue à jour par
+    VACUUM/ANALYZE) au lieu d'un count(*) qui parcourt toute la table.
+    """
+    if connection.vendor == 'postgresql':
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+        row = cursor.fetchone()
+        # reltuples vaut -1 tant que la table n'a jamais été analysée
+        if row and row[0] >= 0:
+            return row[0]
+    
+    cursor.execute(f"SELECT count(*) FROM {table}")
+    return cursor.fetchone()[0]
+
+
+def _collect_celery_metrics():
+    """Interroge les workers Celery (stats, tâches actives et planifiées)."""
+    celery_metrics = {}
+    try:
+        from celery import current_app
+        inspect = current_app.control.inspect()
+        
+        # Statistiques des workers
+        stats = inspect.stats()
+        if stats:
+            celery_metrics['active_workers'] = len(stats)
+            celery_metrics['workers'] = list(stats.keys())
+        
+        # Tâches actives
+        active = inspect.active()
+        if active:
+            total_active = sum(len(tasks) for tasks in active.values())
+            celery_metrics['active_tasks'] = total_active
+        
+        # Tâches planifiées
+        scheduled = inspect.scheduled()
+        if scheduled:
+            total_scheduled = sum(len(tasks) for tasks in scheduled.values())
+            celery_metrics['scheduled_tasks'] = total_scheduled
+            
+    except Exception as e:
+        celery_metrics['error'] = str(e)
+    
+    return celery_metrics
+
+
 def health_detailed(request):
     """
     Health check détaillé avec métriques.
@@ -115,14 +198,10 @@ def health_detailed(request):
         db_metrics = {}
         try:
             with connection.cursor() as cursor:
-                cursor.execute("SELECT version()")
-                db_metrics['version'] = cursor.fetchone()[0]
+                db_metrics['version'] = _get_database_version(cursor)
                 
-                cursor.execute("SELECT count(*) FROM catalog_product")
-                db_metrics['product_count'] = cursor.fetchone()[0]
-                
-                cursor.execute("SELECT count(*) FROM catalog_order")
-                db_metrics['order_count'] = cursor.fetchone()[0]
+                db_metrics['product_count'] = _estimate_row_count(cursor, 'catalog_product')
+                db_metrics['order_count'] = _estimate_row_count(cursor, 'catalog_order')
         except Exception as e:
             db_metrics['error'] = str(e)
         
@@ -136,32 +215,11 @@ def health_detailed(request):
         except Exception as e:
             redis_metrics['error'] = str(e)
         
-        # Métriques Celery
-        celery_metrics = {}
-        try:
-            from celery import current_app
-            inspect = current_app.control.inspect()
-            
-            # Statistiques des workers
-            stats = inspect.stats()
-            if stats:
-                celery_metrics['active_workers'] = len(stats)
-                celery_metrics['workers'] = list(stats.keys())
-            
-            # Tâches actives
-            active = inspect.active()
-            if active:
-                total_active = sum(len(tasks) for tasks in active.values())
-                celery_metrics['active_tasks'] = total_active
-            
-            # Tâches planifiées
-            scheduled = inspect.scheduled()
-            if scheduled:
-                total_scheduled = sum(len(tasks) for tasks in scheduled.values())
-                celery_metrics['scheduled_tasks'] = total_scheduled
-                
-        except Exception as e:
-            celery_metrics['error'] = str(e)
+        # Métriques Celery (mises en cache : chaque inspect attend la réponse des workers)
+        celery_metrics = cache.get(CELERY_METRICS_CACHE_KEY)
+        if celery_metrics is None:
+            celery_metrics = _collect_celery_metrics()
+            cache.set(CELERY_METRICS_CACHE_KEY, celery_metrics, CELERY_METRICS_CACHE_TTL)
         
         # Métriques système
         import psutil
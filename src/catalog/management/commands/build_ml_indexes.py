@@ -3,9 +3,8 @@ Commande Django pour construire les index ML.
 """
 
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
 from catalog.models import Product
-from ml.vectorization import ProductVectorizer
+from ml.vectorization import PRODUCT_TEXT_FIELDS, ProductVectorizer
 from ml.similarity import SimilarityEngine
 from ml.search import SemanticSearchEngine
 from ml.manifest import ml_manifest
@@ -37,8 +36,11 @@ class Command(BaseCommand):
         
         try:
             # Vérifier les produits
-            products = Product.objects.filter(is_active=True)
-            product_count = products.count()
+            # Une seule requête : lignes brutes, cohérentes pour TF-IDF et embeddings
+            rows = list(
+                Product.objects.filter(is_active=True).values_list(*PRODUCT_TEXT_FIELDS)
+            )
+            product_count = len(rows)
             
             if product_count == 0:
                 raise CommandError('Aucun produit actif trouvé dans la base de données')
@@ -51,11 +53,12 @@ class Command(BaseCommand):
             
             # Entraîner le modèle TF-IDF
             self.stdout.write('📊 Entraînement du modèle TF-IDF...')
-            vectorizer.fit_tfidf(products)
+            vectorizer.prepare_rows(rows)
+            vectorizer.fit_tfidf()
             
             # Générer les embeddings
             self.stdout.write('🧠 Génération des embeddings sémantiques...')
-            embeddings = vectorizer.get_embeddings(products)
+            embeddings = vectorizer.get_embeddings()
             
             # Sauvegarder les embeddings
             self.stdout.write('💾 Sauvegarde des embeddings...')
@@ -110,7 +113,7 @@ class Command(BaseCommand):
                 file_path=str(search_engine.faiss_index_path),
                 document_count=len(vectorizer.product_ids),
                 metadata={
-                    'index_type': 'IndexFlatIP',
+                    'index_type': search_engine.index_type,
                     'dimension': embeddings.shape[1],
                 }
             )
@@ -5,8 +5,11 @@ Commande Django pour construire l'index RAG.
 from django.core.management.base import BaseCommand, CommandError
 from ml.rag import RAGAssistant, RAGDocument
 from ml.manifest import ml_manifest
+from ml.config import RAG_DEMO_DOCUMENTS_PATH, RAG_INDEX_PATH
+import itertools
 import os
-import json
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 
 
 class Command(BaseCommand):
@@ -24,15 +27,31 @@ class Command(BaseCommand):
             default='data/rag',
             help='Répertoire contenant les documents RAG',
         )
+        parser.add_argument(
+            '--device',
+            choices=['auto', 'cpu', 'cuda'],
+            default='auto',
+            help='Device pour les embeddings (auto : GPU si disponible)',
+        )
 
     def handle(self, *args, **options):
+        # Index déjà construit : ni embeddings ni manifest à recalculer
+        if RAG_INDEX_PATH.exists() and not options['force']:
+            self.stdout.write(
+                self.style.WARNING(
+                    f'⚠️ Index RAG déjà présent ({RAG_INDEX_PATH}). '
+                    'Utilisez --force pour le reconstruire.'
+                )
+            )
+            return
+        
         self.stdout.write(
             self.style.SUCCESS('🤖 Début de la construction de l\'index RAG...')
         )
         
         try:
             # Créer l'assistant RAG
-            rag_assistant = RAGAssistant()
+            rag_assistant = RAGAssistant(device=options['device'])
             
             # Charger les documents depuis le répertoire
             data_dir = options['data_dir']
@@ -46,16 +65,23 @@ class Command(BaseCommand):
             
             # Enregistrer dans le manifest
             self.stdout.write('📋 Mise à jour du manifest...')
+            metadata = {
+                'chunk_size': 500,
+                'chunk_overlap': 50,
+                'embedding_model': 'sentence-transformers/all-MiniLM-L6-v2',
+                'index_type': rag_assistant.rag_index.index_type,
+                'metric': 'ip_normalized',
+                'dtype': 'fp16',
+            }
+            # IO_FLAG_MMAP ne projette que les listes inversées d'un index IVF
+            if rag_assistant.rag_index.is_ivf:
+                metadata['io_flags'] = 'mmap_read_only'
             ml_manifest.register_index(
                 name='rag_index',
                 index_type='faiss_rag',
-                file_path=str(rag_assistant.rag_index.rag_index_path),
+                file_path=str(RAG_INDEX_PATH),
                 document_count=len(rag_assistant.rag_index.documents),
-                metadata={
-                    'chunk_size': 500,
-                    'chunk_overlap': 50,
-                    'embedding_model': 'sentence-transformers/all-MiniLM-L6-v2',
-                }
+                metadata=metadata
             )
             
             self.stdout.write(
@@ -71,170 +97,58 @@ class Command(BaseCommand):
     def _create_demo_documents(self, rag_assistant):
         """Crée des documents de démonstration pour le RAG."""
         
-        demo_documents = [
-            RAGDocument(
-                content="""
-                Politique de retour SmartMarket
-                
-                Vous avez 30 jours pour retourner un produit non alimentaire en parfait état.
-                Les produits alimentaires ne peuvent pas être retournés pour des raisons d'hygiène.
-                
-                Pour effectuer un retour :
-                1. Connectez-vous à votre compte
-                2. Allez dans "Mes commandes"
-                3. Sélectionnez la commande concernée
-                4. Cliquez sur "Demander un retour"
-                
-                Les frais de retour sont à votre charge, sauf en cas de défaut du produit.
-                Le remboursement sera effectué sous 5-7 jours ouvrés après réception du retour.
-                """,
-                metadata={
-                    'type': 'policy',
-                    'category': 'returns',
-                    'title': 'Politique de retour',
-                    'version': '1.0',
-                }
-            ),
-            
-            RAGDocument(
-                content="""
-                Livraison et expédition SmartMarket
-                
-                Nous livrons partout en France métropolitaine.
-                Délais de livraison :
-                - Standard : 3-5 jours ouvrés
-                - Express : 1-2 jours ouvrés
-                - Point relais : 2-4 jours ouvrés
-                
-                Frais de livraison :
-                - Gratuit à partir de 50€ d'achat
-                - Standard : 4.90€
-                - Express : 9.90€
-                - Point relais : 2.90€
-                
-                Vous recevrez un email de confirmation avec le numéro de suivi.
-                """,
-                metadata={
-                    'type': 'policy',
-                    'category': 'shipping',
-                    'title': 'Livraison et expédition',
-                    'version': '1.0',
-                }
-            ),
-            
-            RAGDocument(
-                content="""
-                Guide d'achat - Électronique
-                
-                Avant d'acheter un produit électronique, vérifiez :
-                - La compatibilité avec vos appareils existants
-                - Les spécifications techniques
-                - La garantie constructeur
-                - Les avis clients
-                
-                Nos produits électroniques sont garantis 2 ans minimum.
-                En cas de problème, contactez notre service client.
-                
-                Conseils d'utilisation :
-                - Lisez toujours le manuel d'utilisation
-                - Respectez les conditions d'utilisation
-                - Évitez les chocs et l'humidité
-                """,
-                metadata={
-                    'type': 'guide',
-                    'category': 'electronics',
-                    'title': 'Guide d\'achat électronique',
-                    'version': '1.0',
-                }
-            ),
-            
-            RAGDocument(
-                content="""
-                Guide d'achat - Mode et vêtements
-                
-                Pour bien choisir vos vêtements :
-                - Consultez notre guide des tailles
-                - Vérifiez la composition des matières
-                - Lisez les conseils d'entretien
-                
-                Tailles disponibles :
-                - Homme : XS à XXL
-                - Femme : 34 à 48
-                - Enfant : 2 ans à 16 ans
-                
-                Retour gratuit sous 30 jours pour les vêtements.
-                Essayez vos vêtements avant de retirer les étiquettes.
-                """,
-                metadata={
-                    'type': 'guide',
-                    'category': 'fashion',
-                    'title': 'Guide d\'achat mode',
-                    'version': '1.0',
-                }
-            ),
-            
-            RAGDocument(
-                content="""
-                FAQ SmartMarket
-                
-                Q: Comment créer un compte ?
-                R: Cliquez sur "S'inscrire" en haut à droite, remplissez le formulaire.
-                
-                Q: Comment modifier ma commande ?
-                R: Vous pouvez modifier votre commande tant qu'elle n'est pas expédiée.
-                
-                Q: Comment contacter le service client ?
-                R: Par email à contact@smartmarket.fr ou par téléphone au 01 23 45 67 89.
-                
-                Q: Puis-je annuler ma commande ?
-                R: Oui, dans les 2 heures suivant la commande.
-                
-                Q: Quels moyens de paiement acceptez-vous ?
-                R: Carte bancaire, PayPal, virement bancaire, chèque.
-                """,
-                metadata={
-                    'type': 'faq',
-                    'category': 'general',
-                    'title': 'FAQ générale',
-                    'version': '1.0',
-                }
-            ),
-        ]
+        demo_documents = self._load_jsonl(RAG_DEMO_DOCUMENTS_PATH)
         
         self.stdout.write(f'📄 Ajout de {len(demo_documents)} documents de démonstration...')
         rag_assistant.add_knowledge_base(demo_documents)
     
+    def _load_jsonl(self, path):
+        """Lit un fichier JSON Lines (un document par ligne)."""
+        
+        with open(path, 'rb') as f:
+            return self._to_documents(orjson.loads(line) for line in f if line.strip())
+    
+    def _to_documents(self, items):
+        """Convertit des dictionnaires {content, metadata} en RAGDocument."""
+        
+        return [
+            RAGDocument(
+                content=item.get('content', ''),
+                metadata=item.get('metadata', {})
+            )
+            for item in items
+        ]
+    
+    def _load_one_json(self, path):
+        """Lit un fichier JSON et retourne ses documents ([] en cas d'erreur)."""
+        
+        try:
+            with open(path, 'rb') as f:
+                data = orjson.loads(f.read())
+            return self._to_documents(data if isinstance(data, list) else [data])
+        except (OSError, orjson.JSONDecodeError, AttributeError) as e:
+            # Fichier illisible, JSON invalide ou élément qui n'est pas un objet
+            self.stdout.write(
+                self.style.WARNING(f'⚠️ Erreur lors du chargement de {os.path.basename(path)}: {e}')
+            )
+            return []
+    
     def _load_documents_from_dir(self, rag_assistant, data_dir):
         """Charge les documents depuis un répertoire."""
         
-        documents = []
+        # scandir : une seule lecture du répertoire, type de fichier mis en cache
+        with os.scandir(data_dir) as entries:
+            filepaths = [
+                entry.path for entry in entries
+                if entry.is_file() and entry.name.endswith('.json')
+            ]
         
-        for filename in os.listdir(data_dir):
-            if filename.endswith('.json'):
-                filepath = os.path.join(data_dir, filename)
-                
-                try:
-                    with open(filepath, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    if isinstance(data, list):
-                        for item in data:
-                            doc = RAGDocument(
-                                content=item.get('content', ''),
-                                metadata=item.get('metadata', {})
-                            )
-                            documents.append(doc)
-                    else:
-                        doc = RAGDocument(
-                            content=data.get('content', ''),
-                            metadata=data.get('metadata', {})
-                        )
-                        documents.append(doc)
-                        
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.WARNING(f'⚠️ Erreur lors du chargement de {filename}: {e}')
-                    )
+        # Lecture / décodage en parallèle (I/O), ordre des fichiers conservé par map
+        max_workers = min(32, (os.cpu_count() or 1) * 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            documents = list(itertools.chain.from_iterable(
+                executor.map(self._load_one_json, filepaths)
+            ))
         
         if documents:
             self.stdout.write(f'📄 Ajout de {len(documents)} documents...')
@@ -4,11 +4,25 @@ Commande pour créer les groupes et utilisateurs de démonstration.
 
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import Group, Permission
 from django.db import transaction
 
 User = get_user_model()
 
+MANAGER_PERMISSION_CODENAMES = [
+    'add_category', 'change_category', 'delete_category', 'view_category',
+    'add_product', 'change_product', 'delete_product', 'view_product',
+    'add_order', 'change_order', 'view_order',
+    'add_orderitem', 'change_orderitem', 'view_orderitem',
+]
+
+CLIENT_PERMISSION_CODENAMES = [
+    'view_category', 'view_product',
+    'add_order', 'view_order',
+    'add_orderitem', 'view_orderitem',
+]
+
 
 class Command(BaseCommand):
     help = "Crée les groupes et utilisateurs de démonstration"
@@ -21,16 +35,23 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
-        if options['reset']:
-            self.stdout.write("Resetting existing data...")
-            self.reset_data()
+        # Messages regroupés en une seule écriture après le commit
+        self.created_msgs = []
+
+        # Tout ou rien : un échec annule aussi le reset et les groupes
+        with transaction.atomic():
+            if options['reset']:
+                self.stdout.write("Resetting existing data...")
+                self.reset_data()
 
-        self.stdout.write("Creating groups and permissions...")
-        self.create_groups()
+            self.stdout.write("Creating groups and permissions...")
+            self.create_groups()
 
-        self.stdout.write("Creating demo users...")
-        self.create_users()
+            self.stdout.write("Creating demo users...")
+            self.create_users()
 
+        if self.created_msgs:
+            self.stdout.write("\n".join(self.created_msgs))
         self.stdout.write(
             self.style.SUCCESS("Successfully created groups and users")
         )
@@ -42,45 +63,42 @@ class Command(BaseCommand):
 
     def create_groups(self):
         """Crée les groupes et leurs permissions."""
+        # Permissions du catalogue chargées une seule fois pour tous les groupes
+        catalog_permissions = Permission.objects.filter(
+            content_type__app_label='catalog'
+        ).in_bulk(field_name='codename')
+
         admin_group, created = Group.objects.get_or_create(name='admin')
         if created:
             admin_permissions = Permission.objects.all()
             admin_group.permissions.set(admin_permissions)
-            self.stdout.write("  - Groupe 'admin' créé")
+            self.created_msgs.append("  - Groupe 'admin' créé")
 
         manager_group, created = Group.objects.get_or_create(name='manager')
         if created:
-            manager_permissions = Permission.objects.filter(
-                content_type__app_label='catalog',
-                codename__in=[
-                    'add_category', 'change_category', 'delete_category', 'view_category',
-                    'add_product', 'change_product', 'delete_product', 'view_product',
-                    'add_order', 'change_order', 'view_order',
-                    'add_orderitem', 'change_orderitem', 'view_orderitem',
-                ]
-            )
-            manager_group.permissions.set(manager_permissions)
-            self.stdout.write("  - Groupe 'manager' créé")
+            manager_group.permissions.set([
+                catalog_permissions[codename]
+                for codename in MANAGER_PERMISSION_CODENAMES
+                if codename in catalog_permissions
+            ])
+            self.created_msgs.append("  - Groupe 'manager' créé")
 
         client_group, created = Group.objects.get_or_create(name='client')
         if created:
-            client_permissions = Permission.objects.filter(
-                content_type__app_label='catalog',
-                codename__in=[
-                    'view_category', 'view_product',
-                    'add_order', 'view_order',
-                    'add_orderitem', 'view_orderitem',
-                ]
-            )
-            client_group.permissions.set(client_permissions)
-            self.stdout.write("  - Groupe 'client' créé")
+            client_group.permissions.set([
+                catalog_permissions[codename]
+                for codename in CLIENT_PERMISSION_CODENAMES
+                if codename in catalog_permissions
+            ])
+            self.created_msgs.append("  - Groupe 'client' créé")
 
     def create_users(self):
         """Crée les utilisateurs de démonstration."""
-        with transaction.atomic():
-            admin_user, created = User.objects.get_or_create(
-                email='admin@smartmarket.com',
-                defaults={
+        # (champs, mot de passe, groupe) par utilisateur de démonstration
+        users_data = [
+            (
+                {
+                    'email': 'admin@smartmarket.com',
                     'username': 'admin',
                     'first_name': 'Admin',
                     'last_name': 'SmartMarket',
@@ -88,33 +106,26 @@ class Command(BaseCommand):
                     'is_superuser': True,
                     'is_active': True,
                     'is_gdpr_consent': True,
-                }
-            )
-            if created:
-                admin_user.set_password('admin123')
-                admin_user.save()
-                self.stdout.write("  - Utilisateur admin créé (admin@smartmarket.com / admin123)")
-
-            manager_user, created = User.objects.get_or_create(
-                email='manager@smartmarket.com',
-                defaults={
+                },
+                'admin123',
+                None,
+            ),
+            (
+                {
+                    'email': 'manager@smartmarket.com',
                     'username': 'manager',
                     'first_name': 'Manager',
                     'last_name': 'SmartMarket',
                     'is_staff': False,
                     'is_active': True,
                     'is_gdpr_consent': True,
-                }
-            )
-            if created:
-                manager_user.set_password('manager123')
-                manager_user.save()
-                manager_user.groups.add(Group.objects.get(name='manager'))
-                self.stdout.write("  - Utilisateur manager créé (manager@smartmarket.com / manager123)")
-
-            client1_user, created = User.objects.get_or_create(
-                email='client1@example.com',
-                defaults={
+                },
+                'manager123',
+                'manager',
+            ),
+            (
+                {
+                    'email': 'client1@example.com',
                     'username': 'client1',
                     'first_name': 'Jean',
                     'last_name': 'Dupont',
@@ -123,17 +134,13 @@ class Command(BaseCommand):
                     'is_staff': False,
                     'is_active': True,
                     'is_gdpr_consent': True,
-                }
-            )
-            if created:
-                client1_user.set_password('client123')
-                client1_user.save()
-                client1_user.groups.add(Group.objects.get(name='client'))
-                self.stdout.write("  - Utilisateur client1 créé (client1@example.com / client123)")
-
-            client2_user, created = User.objects.get_or_create(
-                email='client2@example.com',
-                defaults={
+                },
+                'client123',
+                'client',
+            ),
+            (
+                {
+                    'email': 'client2@example.com',
                     'username': 'client2',
                     'first_name': 'Marie',
                     'last_name': 'Martin',
@@ -142,10 +149,47 @@ class Command(BaseCommand):
                     'is_staff': False,
                     'is_active': True,
                     'is_gdpr_consent': True,
-                }
-            )
-            if created:
-                client2_user.set_password('client123')
-                client2_user.save()
-                client2_user.groups.add(Group.objects.get(name='client'))
-                self.stdout.write("  - Utilisateur client2 créé (client2@example.com / client123)")
+                },
+                'client123',
+                'client',
+            ),
+        ]
+
+        emails = [fields['email'] for fields, _, _ in users_data]
+        existing = set(
+            User.objects.filter(email__in=emails).values_list('email', flat=True)
+        )
+
+        new_users = []
+        for fields, password, _ in users_data:
+            if fields['email'] in existing:
+                continue
+            # Mot de passe haché directement dans les champs : aucun save() supplémentaire
+            new_users.append(User(**fields, password=make_password(password)))
+
+        if not new_users:
+            return
+
+        # Un seul INSERT pour tous les utilisateurs
+        User.objects.bulk_create(new_users, ignore_conflicts=True)
+
+        # Les PK ne sont pas renseignées avec ignore_conflicts : relire par email
+        created = User.objects.in_bulk(
+            [user.email for user in new_users], field_name='email'
+        )
+        groups = Group.objects.in_bulk(field_name='name')
+        Membership = User.groups.through
+        Membership.objects.bulk_create(
+            [
+                Membership(user_id=created[fields['email']].pk, group_id=groups[group_name].pk)
+                for fields, _, group_name in users_data
+                if group_name and fields['email'] in created and group_name in groups
+            ],
+            ignore_conflicts=True,
+        )
+
+        for fields, password, _ in users_data:
+            if fields['email'] in created:
+                self.created_msgs.append(
+                    f"  - Utilisateur {fields['username']} créé ({fields['email']} / {password})"
+                )
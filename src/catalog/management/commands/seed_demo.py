@@ -7,6 +7,9 @@ from django.db import transaction
 
 from catalog.models import Category, Product
 
+# Table de conversion nom -> slug (une seule passe str.translate)
+_SLUG_TRANSLATION = str.maketrans({" ": "-", "é": "e", "è": "e", "à": "a"})
+
 
 class Command(BaseCommand):
     help = "Charge les données de démonstration"
@@ -15,6 +18,9 @@ class Command(BaseCommand):
         """Exécute la commande."""
         self.stdout.write("Chargement des données de démonstration...")
 
+        # Messages regroupés en une seule écriture après le commit
+        created_msgs = []
+
         with transaction.atomic():
             categories_data = [
                 {"name": "Électronique", "slug": "electronique"},
@@ -24,14 +30,22 @@ class Command(BaseCommand):
                 {"name": "Livres", "slug": "livres"},
             ]
 
-            categories = {}
-            for cat_data in categories_data:
-                category, created = Category.objects.get_or_create(
-                    slug=cat_data["slug"], defaults={"name": cat_data["name"]}
-                )
-                categories[cat_data["slug"]] = category
-                if created:
-                    self.stdout.write(f"  ✓ Catégorie créée: {category.name}")
+            slugs = [cat_data["slug"] for cat_data in categories_data]
+            existing_slugs = set(
+                Category.objects.filter(slug__in=slugs).values_list("slug", flat=True)
+            )
+            Category.objects.bulk_create(
+                [
+                    Category(slug=cat_data["slug"], name=cat_data["name"])
+                    for cat_data in categories_data
+                    if cat_data["slug"] not in existing_slugs
+                ],
+                ignore_conflicts=True,
+            )
+            categories = Category.objects.in_bulk(slugs, field_name="slug")
+            for slug in slugs:
+                if slug not in existing_slugs:
+                    created_msgs.append(f"  ✓ Catégorie créée: {categories[slug].name}")
 
             products_data = [
                 {
@@ -120,27 +134,38 @@ class Command(BaseCommand):
                 },
             ]
 
-            for prod_data in products_data:
-                category = categories[prod_data["category"]]
-                product, created = Product.objects.get_or_create(
-                    category=category,
-                    slug=prod_data["name"]
-                    .lower()
-                    .replace(" ", "-")
-                    .replace("é", "e")
-                    .replace("è", "e")
-                    .replace("à", "a"),
-                    defaults={
-                        "name": prod_data["name"],
-                        "description": prod_data["description"],
-                        "price": prod_data["price"],
-                        "stock": prod_data["stock"],
-                        "is_active": True,
-                    },
+            products = [
+                Product(
+                    category=categories[prod_data["category"]],
+                    slug=prod_data["name"].lower().translate(_SLUG_TRANSLATION),
+                    name=prod_data["name"],
+                    description=prod_data["description"],
+                    price=prod_data["price"],
+                    stock=prod_data["stock"],
+                    is_active=True,
                 )
-                if created:
-                    self.stdout.write(f"  ✓ Produit créé: {product.name}")
+                for prod_data in products_data
+            ]
+
+            # Une seule requête pour repérer les produits déjà présents
+            existing = set(
+                Product.objects.filter(
+                    slug__in=[product.slug for product in products]
+                ).values_list("category_id", "slug")
+            )
+            new_products = [
+                product
+                for product in products
+                if (product.category_id, product.slug) not in existing
+            ]
+
+            # Un seul INSERT pour tous les nouveaux produits
+            Product.objects.bulk_create(new_products, ignore_conflicts=True)
+            for product in new_products:
+                created_msgs.append(f"  ✓ Produit créé: {product.name}")
 
+        if created_msgs:
+            self.stdout.write("\n".join(created_msgs))
         self.stdout.write(
             self.style.SUCCESS("Données de démonstration chargées avec succès!")
         )
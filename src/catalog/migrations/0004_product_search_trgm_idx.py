@@ -0,0 +1,37 @@
+from django.db import migrations
+
+# Index trigrammes pour ProductFilter.filter_search : ils couvrent exactement
+# l'expression générée par Django pour __icontains sous PostgreSQL.
+TRGM_INDEXES = [
+    ("product_name_trgm_idx", 'UPPER("name"::text)'),
+    ("product_description_trgm_idx", 'UPPER("description"::text)'),
+]
+
+
+def create_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for name, expression in TRGM_INDEXES:
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS {name} "
+            f"ON catalog_product USING gin ({expression} gin_trgm_ops)"
+        )
+
+
+def drop_trgm_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, _ in TRGM_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("catalog", "0003_order_status_user_created_idx"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trgm_indexes, drop_trgm_indexes),
+    ]
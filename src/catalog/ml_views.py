@@ -2,65 +2,160 @@
 Vues API pour les fonctionnalités ML (recommandations, recherche, RAG).
 """
 
+import asyncio
+import logging
+import threading
 import time
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
-from django.views.decorators.csrf import csrf_exempt
-from django.utils.decorators import method_decorator
-from django.views import View
-from django.core.paginator import Paginator
-from django.db.models import Q
+from asgiref.sync import sync_to_async
 from rest_framework.decorators import api_view, throttle_classes
 from rest_framework.throttling import UserRateThrottle
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework import status
+from rest_framework.exceptions import APIException
 
-from .models import Product, Category
-from .serializers import ProductSerializer
+from .models import Product
+from .serializers import (
+    AssistantQuestionSerializer,
+    ProductMLSerializer,
+    RecommendationsQuerySerializer,
+    SearchQuerySerializer,
+)
 
-# Import des modules ML
-from ml.vectorization import ProductVectorizer
-from ml.similarity import SimilarityEngine
-from ml.search import SemanticSearchEngine
-from ml.rag import RAGAssistant
+# Modules ML légers ; les moteurs (torch, faiss, sklearn) sont importés à
+# l'initialisation, pas au chargement des URLs de chaque worker
 from ml.cache import ml_cache
 from ml.manifest import ml_manifest
 
+logger = logging.getLogger(__name__)
+
+
+# Délai suggéré aux clients (en-tête Retry-After) quand un service ML est indisponible
+ML_RETRY_AFTER = 30  # secondes
+
 
 class MLThrottle(UserRateThrottle):
     """Throttling pour les endpoints ML."""
     scope = 'ml_requests'
 
 
-class RecommendationEngine:
+class MLServiceUnavailable(APIException):
+    """Service ML non initialisé (modèles ou index absents)."""
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Service ML indisponible, réessayez plus tard."
+    default_code = 'ml_service_unavailable'
+    # Converti en en-tête Retry-After par le gestionnaire d'exceptions de DRF
+    wait = ML_RETRY_AFTER
+
+
+class MLService:
+    """Base des services ML chargés à la première utilisation."""
+    
+    def _initialize(self):
+        raise NotImplementedError
+    
+    def ensure_initialized(self):
+        """
+        Initialise le service ou lève MLServiceUnavailable (HTTP 503).
+        
+        Appelé par les vues avant tout calcul : en cas de panne, la requête
+        échoue immédiatement au lieu de construire une réponse vide.
+        """
+        if not self._initialized:
+            self._initialize()
+        
+        if not self._initialized:
+            raise MLServiceUnavailable()
+
+
+def serialize_ranked_products(
+    ranked: List[Tuple[int, float, str]],
+    score_field: str,
+    limit: Optional[int] = None,
+    **filters
+) -> List[Dict[str, Any]]:
+    """
+    Sérialise des résultats (product_id, score, raison) dans l'ordre du classement.
+    
+    Les produits sont chargés en une seule requête IN ; les produits inactifs ou
+    supprimés depuis la construction de l'index sont ignorés.
+    
+    Args:
+        ranked: Résultats classés du moteur ML
+        score_field: Nom du champ de score dans la réponse
+        limit: Nombre maximal de produits retournés
+        **filters: Filtres supplémentaires de la requête IN
+        
+    Returns:
+        Liste des produits sérialisés avec score et raison
+    """
+    products_by_id = Product.objects.filter(
+        id__in=[product_id for product_id, _, _ in ranked], is_active=True, **filters
+    ).select_related('category').only(*ProductMLSerializer.Meta.fields).in_bulk()
+    
+    found = [
+        (products_by_id[product_id], score, reason)
+        for product_id, score, reason in ranked
+        if product_id in products_by_id
+    ][:limit]
+    # Une seule passe de sérialisation, complétée sur place avec score et raison
+    serialized = ProductMLSerializer([product for product, _, _ in found], many=True).data
+    for product_data, (_, score, reason) in zip(serialized, found):
+        product_data[score_field] = round(score, 3)
+        product_data['reason'] = reason
+    return list(serialized)
+
+
+class RecommendationEngine(MLService):
     """Moteur de recommandations."""
     
     def __init__(self):
-        self.vectorizer = ProductVectorizer()
-        self.similarity_engine = SimilarityEngine()
+        # Créés par _initialize
+        self.vectorizer = None
+        self.similarity_engine = None
         self._initialized = False
+        self._lock = threading.Lock()
     
     def _initialize(self):
-        """Initialise le moteur de recommandations."""
+        """
+        Initialise le moteur de recommandations.
+        
+        Verrou à double vérification : sous des premières requêtes concurrentes,
+        un seul thread charge les modèles, les autres attendent puis réutilisent.
+        """
         if self._initialized:
             return
         
-        try:
-            # Charger les modèles
-            self.vectorizer.load_models()
+        with self._lock:
+            if self._initialized:
+                return
             
-            # Charger les embeddings
-            embeddings, product_ids = self.vectorizer.load_embeddings()
-            
-            # Initialiser le moteur de similarité
-            self.similarity_engine.load_embeddings(embeddings, product_ids)
-            
-            self._initialized = True
-            
-        except Exception as e:
-            print(f"Erreur lors de l'initialisation du moteur de recommandations: {e}")
-            self._initialized = False
+            try:
+                from ml.vectorization import ProductVectorizer
+                from ml.similarity import SimilarityEngine
+                
+                self.vectorizer = ProductVectorizer()
+                self.similarity_engine = SimilarityEngine()
+                
+                # Charger les modèles
+                self.vectorizer.load_models()
+                
+                # Charger les embeddings
+                embeddings, product_ids = self.vectorizer.load_embeddings()
+                
+                # Initialiser le moteur de similarité
+                self.similarity_engine.load_embeddings(embeddings, product_ids)
+                
+                # Résultats calculés avec d'anciens embeddings : à oublier
+                ml_cache.clear_local()
+                
+                self._initialized = True
+                
+            except Exception:
+                logger.exception("Erreur lors de l'initialisation du moteur de recommandations")
+                self._initialized = False
     
     def get_recommendations(
         self,
@@ -108,53 +203,74 @@ class RecommendationEngine:
                 )
             
             # Formater les résultats
-            result = []
-            for rec_id, score, reason in recommendations:
-                try:
-                    product = Product.objects.get(id=rec_id, is_active=True)
-                    product_data = ProductSerializer(product).data
-                    product_data['similarity_score'] = round(score, 3)
-                    product_data['reason'] = reason
-                    result.append(product_data)
-                except Product.DoesNotExist:
-                    continue
+            result = serialize_ranked_products(recommendations, 'similarity_score')
             
             # Mettre en cache
             ml_cache.set('recommendations', result, **cache_key)
             
             return result
             
-        except Exception as e:
-            print(f"Erreur lors de l'obtention des recommandations: {e}")
+        except Exception:
+            logger.exception("Erreur lors de l'obtention des recommandations")
             return []
 
 
-class SearchEngine:
+class SearchEngine(MLService):
     """Moteur de recherche sémantique."""
     
     def __init__(self):
-        self.search_engine = SemanticSearchEngine()
-        self.vectorizer = ProductVectorizer()
+        # Créés par _initialize
+        self.search_engine = None
+        self.vectorizer = None
+        # Version du cache 'search' à laquelle les attributs ont été chargés
+        self._attributes_version = None
         self._initialized = False
+        self._lock = threading.Lock()
     
     def _initialize(self):
-        """Initialise le moteur de recherche."""
+        """Initialise le moteur de recherche (une seule fois, sous verrou)."""
         if self._initialized:
             return
         
-        try:
-            # Charger les modèles
-            self.vectorizer.load_models()
-            self.search_engine.load_embedding_model(self.vectorizer.embedding_model)
-            
-            # Charger l'index
-            self.search_engine.load_index()
+        with self._lock:
+            if self._initialized:
+                return
             
-            self._initialized = True
-            
-        except Exception as e:
-            print(f"Erreur lors de l'initialisation du moteur de recherche: {e}")
-            self._initialized = False
+            try:
+                from ml.search import SemanticSearchEngine
+                from ml.vectorization import ProductVectorizer
+                
+                self.search_engine = SemanticSearchEngine()
+                self.vectorizer = ProductVectorizer()
+                
+                # Charger les modèles
+                self.vectorizer.load_models()
+                self.search_engine.load_embedding_model(self.vectorizer.embedding_model)
+                
+                # Charger l'index ; les attributs de filtrage (requête en base)
+                # sont chargés à la première recherche, hors AppConfig.ready()
+                self.search_engine.load_index()
+                
+                self._initialized = True
+                
+            except Exception:
+                logger.exception("Erreur lors de l'initialisation du moteur de recherche")
+                self._initialized = False
+    
+    def _refresh_product_attributes(self):
+        """
+        Recharge les attributs de filtrage si les produits ont changé.
+        
+        Chaque sauvegarde de produit ou de catégorie incrémente la version du
+        cache 'search' (partagée via Redis) : tous les processus rechargent
+        leurs tableaux, une requête par changement et non par recherche.
+        """
+        version = ml_cache.namespace_version('search')
+        if version == self._attributes_version:
+            return
+        
+        self.search_engine.load_product_attributes()
+        self._attributes_version = version
     
     def search(
         self,
@@ -197,6 +313,9 @@ class SearchEngine:
             return cached_result
         
         try:
+            # Filtres sur les données à jour (nouvelle version du cache = produits modifiés)
+            self._refresh_product_attributes()
+            
             # Effectuer la recherche
             search_results = self.search_engine.search_with_filters(
                 query=query,
@@ -206,48 +325,55 @@ class SearchEngine:
                 max_price=max_price
             )
             
-            # Formater les résultats
-            result = []
-            for product_id, score, reason in search_results:
-                try:
-                    product = Product.objects.get(id=product_id, is_active=True)
-                    product_data = ProductSerializer(product).data
-                    product_data['search_score'] = round(score, 3)
-                    product_data['reason'] = reason
-                    result.append(product_data)
-                except Product.DoesNotExist:
-                    continue
+            # Formater les résultats : une seule requête, filtres revérifiés en base
+            filters = {}
+            if category_ids:
+                filters['category_id__in'] = category_ids
+            if min_price is not None:
+                filters['price__gte'] = min_price
+            if max_price is not None:
+                filters['price__lte'] = max_price
+            result = serialize_ranked_products(search_results, 'search_score', k, **filters)
             
             # Mettre en cache
             ml_cache.set('search', result, **cache_key)
             
             return result
             
-        except Exception as e:
-            print(f"Erreur lors de la recherche: {e}")
+        except Exception:
+            logger.exception("Erreur lors de la recherche")
             return []
 
 
-class RAGService:
+class RAGService(MLService):
     """Service RAG pour l'assistant."""
     
     def __init__(self):
-        self.rag_assistant = RAGAssistant()
+        # Créé par _initialize
+        self.rag_assistant = None
         self._initialized = False
+        self._lock = threading.Lock()
     
     def _initialize(self):
-        """Initialise le service RAG."""
+        """Initialise le service RAG (une seule fois, sous verrou)."""
         if self._initialized:
             return
         
-        try:
-            # Charger l'index RAG
-            self.rag_assistant.load_index()
-            self._initialized = True
+        with self._lock:
+            if self._initialized:
+                return
             
-        except Exception as e:
-            print(f"Erreur lors de l'initialisation du service RAG: {e}")
-            self._initialized = False
+            try:
+                from ml.rag import RAGAssistant
+                
+                # Charger l'index RAG
+                self.rag_assistant = RAGAssistant()
+                self.rag_assistant.load_index()
+                self._initialized = True
+                
+            except Exception:
+                logger.exception("Erreur lors de l'initialisation du service RAG")
+                self._initialized = False
     
     def ask_question(
         self,
@@ -283,7 +409,7 @@ class RAGService:
             return response
             
         except Exception as e:
-            print(f"Erreur lors de la question RAG: {e}")
+            logger.exception("Erreur lors de la question RAG")
             return {
                 'answer': "Une erreur s'est produite lors du traitement de votre question.",
                 'sources': [],
@@ -292,6 +418,54 @@ class RAGService:
                 'status': 'error',
                 'error': str(e)
             }
+    
+    async def aask_question(
+        self,
+        question: str,
+        user_context: Dict[str, Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Variante asynchrone de ask_question (vue rag_assistant_async).
+        
+        Args:
+            question: Question de l'utilisateur
+            user_context: Contexte utilisateur
+            
+        Returns:
+            Réponse de l'assistant
+        """
+        if not self._initialized:
+            # Chargement du modèle et de l'index : bloquant, hors boucle d'événements
+            await asyncio.to_thread(self._initialize)
+        
+        if not self._initialized:
+            return {
+                'answer': "L'assistant n'est pas disponible pour le moment.",
+                'sources': [],
+                'trace_id': None,
+                'confidence': 0.0,
+                'status': 'error'
+            }
+        
+        try:
+            return await self.rag_assistant.aask(question, user_context)
+            
+        except Exception as e:
+            logger.exception("Erreur lors de la question RAG")
+            return {
+                'answer': "Une erreur s'est produite lors du traitement de votre question.",
+                'sources': [],
+                'trace_id': None,
+                'confidence': 0.0,
+                'status': 'error',
+                'error': str(e)
+            }
+
+
+def _invalid_params_response(serializer) -> Response:
+    """Réponse 400 au format {'error': ...} avec le premier message de validation."""
+    messages = next(iter(serializer.errors.values()))
+    return Response({'error': str(messages[0])}, status=status.HTTP_400_BAD_REQUEST)
 
 
 # Instances globales
@@ -300,6 +474,13 @@ search_engine = SearchEngine()
 rag_service = RAGService()
 
 
+def warm_up_ml_services():
+    """Charge les modèles et index ML avant la première requête."""
+    recommendation_engine._initialize()
+    search_engine._initialize()
+    rag_service._initialize()
+
+
 @api_view(['GET'])
 @throttle_classes([MLThrottle])
 def product_recommendations(request, product_id):
@@ -319,9 +500,15 @@ def product_recommendations(request, product_id):
             status=status.HTTP_404_NOT_FOUND
         )
     
-    # Paramètres de la requête
-    k = min(int(request.GET.get('k', 10)), 50)  # Limiter à 50
-    use_diversity = request.GET.get('diversity', 'false').lower() == 'true'
+    # Paramètres de la requête (k limité à 50)
+    params = RecommendationsQuerySerializer(data=request.GET)
+    if not params.is_valid():
+        return _invalid_params_response(params)
+    k = params.validated_data['k']
+    use_diversity = params.validated_data['diversity']
+    
+    # Modèles non chargés : 503 immédiat
+    recommendation_engine.ensure_initialized()
     
     # Obtenir les recommandations
     recommendations = recommendation_engine.get_recommendations(
@@ -357,46 +544,20 @@ def semantic_search(request):
     """
     start_time = time.time()
     
-    # Paramètres de la requête
-    query = request.GET.get('q', '').strip()
-    if not query:
-        return Response(
-            {'error': 'Paramètre q (query) requis'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    k = min(int(request.GET.get('k', 20)), 100)  # Limiter à 100
+    # Paramètres de la requête (k limité à 100)
+    params = SearchQuerySerializer(data=request.GET)
+    if not params.is_valid():
+        return _invalid_params_response(params)
+    query = params.validated_data['q']
+    k = params.validated_data['k']
     
     # Filtres optionnels
-    category_ids = None
-    if request.GET.get('category'):
-        try:
-            category_ids = [int(cat_id) for cat_id in request.GET.get('category').split(',')]
-        except ValueError:
-            return Response(
-                {'error': 'IDs de catégorie invalides'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+    category_ids = params.validated_data.get('category')
+    min_price = params.validated_data['min_price']
+    max_price = params.validated_data['max_price']
     
-    min_price = request.GET.get('min_price')
-    if min_price:
-        try:
-            min_price = float(min_price)
-        except ValueError:
-            return Response(
-                {'error': 'Prix minimum invalide'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-    
-    max_price = request.GET.get('max_price')
-    if max_price:
-        try:
-            max_price = float(max_price)
-        except ValueError:
-            return Response(
-                {'error': 'Prix maximum invalide'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+    # Index non chargé : 503 immédiat
+    search_engine.ensure_initialized()
     
     # Effectuer la recherche
     results = search_engine.search(
@@ -435,16 +596,15 @@ def rag_assistant(request):
     """
     start_time = time.time()
     
-    # Vérifier les données de la requête
-    question = request.data.get('question', '').strip()
-    if not question:
-        return Response(
-            {'error': 'Paramètre question requis'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+    # Vérifier les données de la requête (contexte utilisateur optionnel)
+    params = AssistantQuestionSerializer(data=request.data)
+    if not params.is_valid():
+        return _invalid_params_response(params)
+    question = params.validated_data['question']
+    user_context = params.validated_data['user_context']
     
-    # Contexte utilisateur optionnel
-    user_context = request.data.get('user_context', {})
+    # Index RAG non chargé : 503 immédiat
+    rag_service.ensure_initialized()
     
     # Poser la question à l'assistant
     response = rag_service.ask_question(
@@ -459,6 +619,68 @@ def rag_assistant(request):
     return Response(response)
 
 
+class RAGAssistantGate(APIView):
+    """
+    Contrôles DRF de rag_assistant_async : authentification, permissions,
+    throttling et validation. Renvoie les données validées (200) ou l'erreur.
+    """
+    throttle_classes = [MLThrottle]
+    
+    def post(self, request):
+        params = AssistantQuestionSerializer(data=request.data)
+        if not params.is_valid():
+            return _invalid_params_response(params)
+        return Response(params.validated_data)
+
+
+_rag_assistant_gate = sync_to_async(RAGAssistantGate.as_view())
+
+
+async def rag_assistant_async(request):
+    """
+    Endpoint asynchrone pour l'assistant RAG (déploiement ASGI, ML_RAG_ASYNC).
+    
+    L'attente du LLM ne mobilise pas de thread : un worker sert de nombreuses
+    questions en parallèle.
+    
+    POST /api/v1/assistant/ask
+    """
+    start_time = time.time()
+    
+    # Contrôles DRF (accès DB/cache synchrones) dans un thread
+    gate = await _rag_assistant_gate(request)
+    if gate.status_code != status.HTTP_200_OK:
+        return gate
+    
+    # Index RAG non chargé : 503 immédiat (hors DRF, réponse construite ici)
+    try:
+        await asyncio.to_thread(rag_service.ensure_initialized)
+    except MLServiceUnavailable as exc:
+        return JsonResponse(
+            {'detail': str(exc.detail)},
+            status=exc.status_code,
+            headers={'Retry-After': str(exc.wait)}
+        )
+    
+    # Poser la question à l'assistant
+    response = await rag_service.aask_question(
+        question=gate.data['question'],
+        user_context=gate.data['user_context']
+    )
+    
+    # Calculer le temps de réponse
+    response_time = round((time.time() - start_time) * 1000, 2)
+    response['response_time_ms'] = response_time
+    
+    return JsonResponse(response)
+
+
+# Le CSRF est vérifié par SessionAuthentication dans RAGAssistantGate (comme pour
+# les vues DRF) ; attribut posé directement, le décorateur csrf_exempt
+# n'enveloppant pas les coroutines avant Django 5.0
+rag_assistant_async.csrf_exempt = True
+
+
 @api_view(['GET'])
 def ml_status(request):
     """
@@ -5,6 +5,7 @@ Modèles pour l'application catalog.
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils.functional import cached_property
 from django.utils.text import slugify
 from django.contrib.auth.models import AbstractUser
 
@@ -79,6 +80,29 @@ class Product(models.Model):
             models.Index(
                 fields=["category", "is_active"], name="product_category_active_idx"
             ),
+            # Index partiels pour ProductFilter.filter_in_stock
+            models.Index(
+                fields=["is_active"],
+                name="product_in_stock_idx",
+                condition=models.Q(stock__gt=0),
+            ),
+            models.Index(
+                fields=["is_active"],
+                name="product_out_of_stock_idx",
+                condition=models.Q(stock=0),
+            ),
+            # Index partiel pour les lectures par lot id IN (...) AND is_active des vues ML
+            models.Index(
+                fields=["id"],
+                name="product_active_idx",
+                condition=models.Q(is_active=True),
+            ),
+            # Index partiel pour les listes de produits actifs par catégorie
+            models.Index(
+                fields=["category", "is_active", "-created_at"],
+                name="prod_cat_active_created",
+                condition=models.Q(is_active=True),
+            ),
         ]
 
     def __str__(self):
@@ -113,6 +137,16 @@ class User(AbstractUser):
     
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.email})"
+    
+    @cached_property
+    def group_names(self):
+        """
+        Noms des groupes de l'utilisateur, chargés en une requête.
+        
+        Les vérifications de rôle d'une même requête (permissions, vues)
+        réutilisent ce résultat ; invalidé par le signal m2m_changed des groupes.
+        """
+        return frozenset(self.groups.values_list('name', flat=True))
 
 
 class Order(models.Model):
@@ -160,6 +194,21 @@ class Order(models.Model):
         indexes = [
             models.Index(fields=["user", "status"], name="order_user_status_idx"),
             models.Index(fields=["created_at"], name="order_created_at_idx"),
+            models.Index(
+                fields=["-created_at", "-id"], name="order_created_id_desc_idx"
+            ),
+            models.Index(fields=["status"], name="order_status_idx"),
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="order_user_created_id_idx",
+            ),
+            # Filtre par statut trié par date (tableaux de bord) ; colonnes
+            # incluses pour les listes servies par l'index seul (PostgreSQL)
+            models.Index(
+                fields=["status", "-created_at"],
+                name="order_status_created_idx",
+                include=["total_amount", "user"],
+            ),
         ]
     
     def __str__(self):
@@ -38,7 +38,7 @@ class IsManagerOrAdmin(permissions.BasePermission):
     def has_permission(self, request, view):
         return (
             request.user.is_authenticated and 
-            (request.user.is_staff or request.user.groups.filter(name='manager').exists())
+            (request.user.is_staff or 'manager' in request.user.group_names)
         )
 
 
@@ -51,10 +51,10 @@ class IsClientOrManagerOrAdmin(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         
-        if request.user.is_staff or request.user.groups.filter(name='manager').exists():
+        if request.user.is_staff or 'manager' in request.user.group_names:
             return True
         
-        return request.user.groups.filter(name='client').exists()
+        return 'client' in request.user.group_names
 
 
 class ReadOnlyOrManagerOrAdmin(permissions.BasePermission):
@@ -68,7 +68,7 @@ class ReadOnlyOrManagerOrAdmin(permissions.BasePermission):
         
         return (
             request.user.is_authenticated and 
-            (request.user.is_staff or request.user.groups.filter(name='manager').exists())
+            (request.user.is_staff or 'manager' in request.user.group_names)
         )
 
 
@@ -84,8 +84,14 @@ class SensitiveEndpointPermission(permissions.BasePermission):
         if request.user.is_staff:
             return True
         
-        if hasattr(view, 'get_object'):
-            obj = view.get_object()
-            return obj == request.user
+        # Propriété vérifiée sur l'identifiant de l'URL : pas de requête ici,
+        # l'objet est chargé une seule fois par la vue (has_object_permission)
+        lookup_url_kwarg = getattr(view, 'lookup_url_kwarg', None) or getattr(view, 'lookup_field', 'pk')
+        lookup_value = view.kwargs.get(lookup_url_kwarg)
+        if lookup_value is None:
+            return False
         
-        return False
+        return str(lookup_value) == str(request.user.pk)
+    
+    def has_object_permission(self, request, view, obj):
+        return request.user.is_staff or obj == request.user
@@ -0,0 +1,39 @@
+"""
+Renderers DRF pour SmartMarket.
+"""
+
+from decimal import Decimal
+
+import orjson
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Repli de DRF pour les autres types (timedelta, bytes, ensembles, QuerySet,
+# générateurs, scalaires et tableaux numpy...)
+_drf_encoder = JSONEncoder()
+
+
+def _default(obj):
+    """Types non gérés nativement par orjson."""
+    if isinstance(obj, (Decimal, Promise)):
+        return str(obj)
+    return _drf_encoder.default(obj)
+
+
+class ORJSONRenderer(BaseRenderer):
+    """
+    Renderer JSON basé sur orjson (encodage en C).
+    
+    Remplace rest_framework.renderers.JSONRenderer : même media type, sortie
+    UTF-8 compacte, datetime/UUID encodés nativement.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Clés non textuelles (entiers...) acceptées comme avec json.dumps
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
@@ -5,9 +5,12 @@ Serializers pour l'API REST de l'application catalog.
 from decimal import Decimal
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Count, Prefetch
 from django.utils import timezone
 
 from .models import Category, Product, Order, OrderItem
+from ml.cache import ml_cache
 
 User = get_user_model()
 
@@ -49,6 +52,17 @@ class ProductDetailSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'slug', 'created_at', 'updated_at']
 
 
+class ProductMLSerializer(serializers.ModelSerializer):
+    """Serializer léger pour les réponses ML (sans description ni horodatages)."""
+    
+    category = CategorySerializer(read_only=True)
+    
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'slug', 'price', 'stock', 'is_active', 'category']
+        read_only_fields = fields
+
+
 class ProductCreateUpdateSerializer(serializers.ModelSerializer):
     """Serializer pour la création/modification des produits."""
     
@@ -125,7 +139,16 @@ class OrderListSerializer(serializers.ModelSerializer):
     
     def get_items_count(self, obj):
         """Retourne le nombre d'éléments dans la commande."""
+        # Annotation de setup_eager_loading ; à défaut COUNT (ou éléments préchargés)
+        items_count = getattr(obj, 'items_count', None)
+        if items_count is not None:
+            return items_count
         return obj.items.count()
+    
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """Précharge l'utilisateur et compte les éléments dans la même requête."""
+        return queryset.select_related('user').annotate(items_count=Count('items'))
 
 
 class OrderDetailSerializer(serializers.ModelSerializer):
@@ -142,6 +165,17 @@ class OrderDetailSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'user', 'total_amount', 'created_at', 'updated_at']
+    
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        """
+        Précharge toutes les données imbriquées : 2 requêtes (commandes et
+        utilisateur, puis éléments avec produit et catégorie) quel que soit le
+        nombre de commandes et d'éléments.
+        """
+        return queryset.select_related('user').prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product__category'))
+        )
 
 
 class OrderCreateSerializer(serializers.ModelSerializer):
@@ -162,45 +196,67 @@ class OrderCreateSerializer(serializers.ModelSerializer):
         return value
     
     def create(self, validated_data):
-        """Crée une nouvelle commande avec ses éléments."""
+        """
+        Crée une nouvelle commande avec ses éléments.
+        
+        Produits chargés et verrouillés en une requête, éléments insérés et stocks
+        décrémentés en une requête chacun : le nombre de requêtes ne dépend plus
+        du nombre de lignes.
+        """
         items_data = validated_data.pop('items')
-        user = self.context['request'].user
         
-        total_amount = Decimal('0.00')
         order_items = []
         
-        for item_data in items_data:
-            product = Product.objects.get(id=item_data['product_id'])
-            if not product.is_active:
-                raise serializers.ValidationError(
-                    f"Le produit {product.name} n'est plus disponible."
-                )
-            if product.stock < item_data['quantity']:
-                raise serializers.ValidationError(
-                    f"Stock insuffisant pour {product.name}. "
-                    f"Disponible: {product.stock}, Demandé: {item_data['quantity']}"
-                )
+        with transaction.atomic():
+            # Verrou sur les lignes produit : pas de vente du même stock en parallèle
+            products = Product.objects.select_for_update().in_bulk(
+                {item_data['product_id'] for item_data in items_data}
+            )
             
-            unit_price = product.price
-            total_amount += unit_price * item_data['quantity']
+            for item_data in items_data:
+                product = products.get(item_data['product_id'])
+                if product is None:
+                    raise serializers.ValidationError(
+                        f"Le produit {item_data['product_id']} n'existe pas."
+                    )
+                if not product.is_active:
+                    raise serializers.ValidationError(
+                        f"Le produit {product.name} n'est plus disponible."
+                    )
+                if product.stock < item_data['quantity']:
+                    raise serializers.ValidationError(
+                        f"Stock insuffisant pour {product.name}. "
+                        f"Disponible: {product.stock}, Demandé: {item_data['quantity']}"
+                    )
+                
+                # Décrément en mémoire : une ligne en double voit le stock restant
+                product.stock -= item_data['quantity']
+                
+                order_items.append(OrderItem(
+                    product=product,
+                    quantity=item_data['quantity'],
+                    unit_price=product.price
+                ))
             
-            order_items.append({
-                'product': product,
-                'quantity': item_data['quantity'],
-                'unit_price': unit_price
-            })
-        
-        order = Order.objects.create(
-            total_amount=total_amount,
-            **validated_data
-        )
-        
-        for item_data in order_items:
-            OrderItem.objects.create(order=order, **item_data)
+            # Total calculé avant l'INSERT : la commande est créée complète
+            # (signal post_save inclus), sans UPDATE ni agrégat supplémentaire
+            order = Order.objects.create(
+                total_amount=sum(
+                    (order_item.total_price for order_item in order_items), Decimal('0.00')
+                ),
+                **validated_data
+            )
             
-            product = item_data['product']
-            product.stock -= item_data['quantity']
-            product.save()
+            for order_item in order_items:
+                order_item.order = order
+            OrderItem.objects.bulk_create(order_items, batch_size=500)
+            
+            # Un seul UPDATE pour tous les stocks (sans post_save par produit)
+            touched = {order_item.product_id: order_item.product for order_item in order_items}
+            Product.objects.bulk_update(touched.values(), ['stock'], batch_size=1000)
+            
+            # Stocks exposés par les résultats ML en cache : une invalidation par commande
+            transaction.on_commit(ml_cache.invalidate_ranked_results)
         
         return order
 
@@ -240,9 +296,12 @@ class UserGDPRExportSerializer(serializers.Serializer):
     
     def to_representation(self, instance):
         """Formate les données pour l'export RGPD."""
+        # Éléments, produits et catégories préchargés : nombre de requêtes
+        # constant quel que soit l'historique de commandes
+        orders = OrderDetailSerializer.setup_eager_loading(instance.orders.all())
         return {
             'user_data': UserSerializer(instance).data,
-            'orders': OrderDetailSerializer(instance.orders.all(), many=True).data,
+            'orders': OrderDetailSerializer(orders, many=True).data,
             'export_date': timezone.now().isoformat(),
             'export_purpose': 'RGPD - Droit à la portabilité des données',
             'data_retention_info': {
@@ -250,3 +309,69 @@ class UserGDPRExportSerializer(serializers.Serializer):
                 'personal_data_retention': 'Conservées jusqu\'à suppression du compte'
             }
         }
+
+
+class RecommendationsQuerySerializer(serializers.Serializer):
+    """Paramètres de requête de l'endpoint des recommandations."""
+    
+    k = serializers.IntegerField(
+        default=10, min_value=1,
+        error_messages={'invalid': 'Paramètre k invalide', 'min_value': 'Paramètre k invalide'}
+    )
+    diversity = serializers.BooleanField(
+        default=False, error_messages={'invalid': 'Paramètre diversity invalide'}
+    )
+    
+    def validate_k(self, value):
+        """Limite k à 50 (valeurs supérieures ramenées au maximum)."""
+        return min(value, 50)
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    """Paramètres de requête de l'endpoint de recherche sémantique."""
+    
+    q = serializers.CharField(
+        error_messages={
+            'required': 'Paramètre q (query) requis',
+            'blank': 'Paramètre q (query) requis',
+        }
+    )
+    k = serializers.IntegerField(
+        default=20, min_value=1,
+        error_messages={'invalid': 'Paramètre k invalide', 'min_value': 'Paramètre k invalide'}
+    )
+    category = serializers.CharField(required=False, allow_blank=True)
+    min_price = serializers.FloatField(
+        required=False, allow_null=True, default=None,
+        error_messages={'invalid': 'Prix minimum invalide'}
+    )
+    max_price = serializers.FloatField(
+        required=False, allow_null=True, default=None,
+        error_messages={'invalid': 'Prix maximum invalide'}
+    )
+    
+    def validate_k(self, value):
+        """Limite k à 100 (valeurs supérieures ramenées au maximum)."""
+        return min(value, 100)
+    
+    def validate_category(self, value):
+        """Convertit la liste CSV d'IDs de catégorie en entiers (None si vide)."""
+        if not value:
+            return None
+        try:
+            return [int(cat_id) for cat_id in value.split(',')]
+        except ValueError:
+            raise serializers.ValidationError('IDs de catégorie invalides')
+
+
+class AssistantQuestionSerializer(serializers.Serializer):
+    """Corps de requête de l'endpoint de l'assistant RAG."""
+    
+    question = serializers.CharField(
+        error_messages={
+            'required': 'Paramètre question requis',
+            'blank': 'Paramètre question requis',
+            'null': 'Paramètre question requis',
+        }
+    )
+    user_context = serializers.DictField(required=False, default=dict)
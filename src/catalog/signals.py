@@ -2,70 +2,103 @@
 Signaux Django pour l'invalidation du cache ML et notifications temps réel.
 """
 
-import json
-from django.db.models.signals import post_save, post_delete
+import asyncio
+import logging
+import threading
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
+from django.core.cache import cache
 from django.db import transaction
 from django.utils import timezone
 from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 
-from .models import Product, Category, Order
+from .models import Product, Category, Order, User
 from ml.cache import ml_cache
 from .tasks import send_order_email
+from .consumers import RECENT_ORDERS_CACHE_KEY, serialize_frames
 
+logger = logging.getLogger(__name__)
 
-@receiver(post_save, sender=Product)
-def invalidate_product_cache_on_save(sender, instance, **kwargs):
+
+# Invalidations ML en attente dans le thread, exécutées une fois au commit
+_pending_ml_invalidation = threading.local()
+
+
+def _schedule_ml_invalidation(product_id=None):
     """
-    Invalide le cache ML lorsqu'un produit est sauvegardé.
+    Programme l'invalidation du cache ML au commit de la transaction courante.
+    
+    Les sauvegardes d'une même transaction (import, édition groupée) partagent
+    une seule invalidation au lieu de plusieurs suppressions par pattern chacune.
+    
+    Args:
+        product_id: ID du produit modifié (None pour une catégorie)
     """
+    product_ids = getattr(_pending_ml_invalidation, 'product_ids', None)
+    if product_ids is None:
+        product_ids = _pending_ml_invalidation.product_ids = set()
+    if product_id is not None:
+        product_ids.add(product_id)
+    
+    # Un rappel par sauvegarde (simple ajout en mémoire) : le premier exécuté
+    # traite tout l'ensemble, les suivants ne trouvent plus rien. Après un
+    # rollback, l'ensemble restant est traité au commit suivant.
+    transaction.on_commit(_flush_ml_invalidation)
+
+
+def _flush_ml_invalidation():
+    """Exécute les invalidations ML programmées dans ce thread."""
+    product_ids = getattr(_pending_ml_invalidation, 'product_ids', None)
+    if product_ids is None:
+        return
+    _pending_ml_invalidation.product_ids = None
+    
     try:
-        # Invalider le cache pour ce produit
-        ml_cache.invalidate_product_cache(instance.id)
+        if product_ids:
+            ml_cache.invalidate_products_cache(product_ids)
+        else:
+            # Catégories seules : les résultats classés embarquent la catégorie
+            ml_cache.invalidate_ranked_results()
         
-        # Invalider aussi le cache global des recommandations et recherche
-        # car les embeddings peuvent avoir changé
-        ml_cache.delete_pattern("recommendations:*")
-        ml_cache.delete_pattern("search:*")
-        
-    except Exception as e:
-        # Ne pas faire échouer la sauvegarde si le cache échoue
-        print(f"Erreur lors de l'invalidation du cache pour le produit {instance.id}: {e}")
+    except Exception:
+        # Ne pas faire échouer la transaction si le cache échoue
+        logger.exception("Erreur lors de l'invalidation du cache ML")
 
 
-@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Product, dispatch_uid='catalog.invalidate_product_cache_on_save')
+def invalidate_product_cache_on_save(sender, instance, **kwargs):
+    """
+    Invalide le cache ML lorsqu'un produit est sauvegardé.
+    """
+    _schedule_ml_invalidation(instance.id)
+
+
+@receiver(post_delete, sender=Product, dispatch_uid='catalog.invalidate_product_cache_on_delete')
 def invalidate_product_cache_on_delete(sender, instance, **kwargs):
     """
     Invalide le cache ML lorsqu'un produit est supprimé.
     """
-    try:
-        # Invalider le cache pour ce produit
-        ml_cache.invalidate_product_cache(instance.id)
-        
-        # Invalider aussi le cache global
-        ml_cache.delete_pattern("recommendations:*")
-        ml_cache.delete_pattern("search:*")
-        
-    except Exception as e:
-        print(f"Erreur lors de l'invalidation du cache pour le produit supprimé {instance.id}: {e}")
+    _schedule_ml_invalidation(instance.id)
 
 
-@receiver(post_save, sender=Category)
+@receiver(post_save, sender=Category, dispatch_uid='catalog.invalidate_category_cache_on_save')
 def invalidate_category_cache_on_save(sender, instance, **kwargs):
     """
     Invalide le cache ML lorsqu'une catégorie est modifiée.
     """
-    try:
-        # Invalider le cache global car les catégories affectent les recommandations
-        ml_cache.delete_pattern("recommendations:*")
-        ml_cache.delete_pattern("search:*")
-        
-    except Exception as e:
-        print(f"Erreur lors de l'invalidation du cache pour la catégorie {instance.id}: {e}")
+    _schedule_ml_invalidation()
+
+
+@receiver(post_delete, sender=Category, dispatch_uid='catalog.invalidate_category_cache_on_delete')
+def invalidate_category_cache_on_delete(sender, instance, **kwargs):
+    """
+    Invalide le cache ML lorsqu'une catégorie est supprimée.
+    """
+    _schedule_ml_invalidation()
 
 
-@receiver(post_save, sender=Order)
+@receiver(post_save, sender=Order, dispatch_uid='catalog.handle_order_created')
 def handle_order_created(sender, instance, created, **kwargs):
     """
     Gère la création d'une nouvelle commande.
@@ -82,17 +115,51 @@ def handle_order_created(sender, instance, created, **kwargs):
         )
 
 
-@receiver(post_save, sender=Order)
-def handle_order_updated(sender, instance, **kwargs):
+@receiver(post_save, sender=Order, dispatch_uid='catalog.handle_order_updated')
+def handle_order_updated(sender, instance, created, **kwargs):
     """
     Gère la mise à jour d'une commande.
     """
+    if created:
+        # La création est déjà notifiée par handle_order_created
+        return
+    
     # Envoyer une notification WebSocket aux admins et à l'utilisateur
     transaction.on_commit(
         lambda: send_order_update_notifications(instance)
     )
 
 
+@receiver(post_save, sender=Order, dispatch_uid='catalog.invalidate_recent_orders_cache.post_save')
+@receiver(post_delete, sender=Order, dispatch_uid='catalog.invalidate_recent_orders_cache.post_delete')
+def invalidate_recent_orders_cache(sender, instance, **kwargs):
+    """
+    Invalide la liste des commandes récentes servie aux admins via WebSocket.
+    """
+    transaction.on_commit(
+        lambda: cache.delete(RECENT_ORDERS_CACHE_KEY)
+    )
+
+
+def _group_send_many(channel_layer, messages):
+    """
+    Diffuse plusieurs messages de groupe en un seul passage async_to_sync.
+    
+    Les envois partent en parallèle sur la même boucle d'événements au lieu
+    d'un aller-retour bloquant par groupe.
+    
+    Args:
+        channel_layer: Couche de canaux
+        messages: Liste de tuples (groupe, message)
+    """
+    async def _fanout():
+        await asyncio.gather(*(
+            channel_layer.group_send(group, message) for group, message in messages
+        ))
+    
+    async_to_sync(_fanout)()
+
+
 def send_order_notification_to_admins(order):
     """
     Envoie une notification de nouvelle commande aux admins.
@@ -106,42 +173,38 @@ def send_order_notification_to_admins(order):
                 'id': order.user.id,
                 'username': order.user.username,
             },
-            'product': {
-                'id': order.product.id,
-                'name': order.product.name,
-            },
-            'quantity': order.quantity,
-            'total_price': str(order.total_price),
+            'total_price': order.total_amount,
             'status': order.status,
-            'created_at': order.created_at.isoformat(),
+            'created_at': order.created_at,
         }
+        timestamp = timezone.now()
         
-        async_to_sync(channel_layer.group_send)(
-            'admin_orders',
-            {
-                'type': 'order_created',
-                'order': order_data,
-                'timestamp': timezone.now().isoformat()
-            }
-        )
+        # Notification générale envoyée avec la commande
+        notification = {
+            'type': 'new_order',
+            'message': f'Nouvelle commande #{order.id} de {order.user.username}',
+            'order_id': order.id,
+            'user_id': order.user.id,
+        }
         
-        # Envoyer aussi une notification générale
-        async_to_sync(channel_layer.group_send)(
-            'admin_notifications',
-            {
+        # Trames sérialisées une seule fois, relayées telles quelles par les consumers
+        _group_send_many(channel_layer, [
+            ('admin_orders', {
+                'type': 'order_created',
+                **serialize_frames(
+                    'order_created', order=order_data, timestamp=timestamp
+                ),
+            }),
+            ('admin_notifications', {
                 'type': 'system_notification',
-                'notification': {
-                    'type': 'new_order',
-                    'message': f'Nouvelle commande #{order.id} de {order.user.username}',
-                    'order_id': order.id,
-                    'user_id': order.user.id,
-                },
-                'timestamp': timezone.now().isoformat()
-            }
-        )
+                **serialize_frames(
+                    'system_notification', notification=notification, timestamp=timestamp
+                ),
+            }),
+        ])
         
-    except Exception as e:
-        print(f"Erreur lors de l'envoi de notification de commande: {e}")
+    except Exception:
+        logger.exception("Erreur lors de l'envoi de notification de commande")
 
 
 def send_order_update_notifications(order):
@@ -150,6 +213,7 @@ def send_order_update_notifications(order):
     """
     try:
         channel_layer = get_channel_layer()
+        timestamp = timezone.now()
         
         order_data = {
             'id': order.id,
@@ -157,38 +221,29 @@ def send_order_update_notifications(order):
                 'id': order.user.id,
                 'username': order.user.username,
             },
-            'product': {
-                'id': order.product.id,
-                'name': order.product.name,
-            },
-            'quantity': order.quantity,
-            'total_price': str(order.total_price),
+            'total_price': order.total_amount,
             'status': order.status,
-            'updated_at': timezone.now().isoformat(),
+            'updated_at': timestamp,
         }
         
-        # Notification aux admins
-        async_to_sync(channel_layer.group_send)(
-            'admin_orders',
-            {
+        # Notification aux admins et à l'utilisateur
+        _group_send_many(channel_layer, [
+            ('admin_orders', {
                 'type': 'order_updated',
-                'order': order_data,
-                'timestamp': timezone.now().isoformat()
-            }
-        )
-        
-        # Notification à l'utilisateur
-        async_to_sync(channel_layer.group_send)(
-            f'user_{order.user.id}_notifications',
-            {
+                **serialize_frames(
+                    'order_updated', order=order_data, timestamp=timestamp
+                ),
+            }),
+            (f'user_{order.user.id}_notifications', {
                 'type': 'order_status_update',
-                'order': order_data,
-                'timestamp': timezone.now().isoformat()
-            }
-        )
+                **serialize_frames(
+                    'order_status_update', order=order_data, timestamp=timestamp
+                ),
+            }),
+        ])
         
-    except Exception as e:
-        print(f"Erreur lors de l'envoi de notification de mise à jour: {e}")
+    except Exception:
+        logger.exception("Erreur lors de l'envoi de notification de mise à jour")
 
 
 def send_ml_task_notification(task_name, status, result=None):
@@ -202,29 +257,29 @@ def send_ml_task_notification(task_name, status, result=None):
             'admin_notifications',
             {
                 'type': 'ml_task_completed',
-                'task': {
-                    'name': task_name,
-                    'status': status,
-                    'result': result,
-                },
-                'timestamp': timezone.now().isoformat()
+                **serialize_frames(
+                    'ml_task_completed',
+                    task={
+                        'name': task_name,
+                        'status': status,
+                        'result': result,
+                    },
+                    timestamp=timezone.now(),
+                ),
             }
         )
         
-    except Exception as e:
-        print(f"Erreur lors de l'envoi de notification de tâche ML: {e}")
+    except Exception:
+        logger.exception("Erreur lors de l'envoi de notification de tâche ML")
 
 
-@receiver(post_delete, sender=Category)
-def invalidate_category_cache_on_delete(sender, instance, **kwargs):
+@receiver(m2m_changed, sender=User.groups.through, dispatch_uid='catalog.invalidate_user_group_names')
+def invalidate_user_group_names(sender, instance, action, **kwargs):
     """
-    Invalide le cache ML lorsqu'une catégorie est supprimée.
+    Oublie les noms de groupes mémorisés quand l'appartenance change.
+    
+    Seule l'instance passée au signal est concernée : côté groupe
+    (group.user_set.add), les utilisateurs sont rechargés à la requête suivante.
     """
-    try:
-        # Invalider le cache de recherche
-        ml_cache.delete_pattern("search:*")
-        
-    except Exception as e:
-        print(f"Erreur lors de l'invalidation du cache pour la catégorie supprimée {instance.id}: {e}")
-
-
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, User):
+        instance.__dict__.pop('group_names', None)
@@ -11,9 +11,10 @@ from celery import shared_task
 from django.core.mail import send_mail
 from django.conf import settings
 from django.db import transaction
+from django.db.models import Prefetch
 from django.utils import timezone
 
-from .models import Product, Order, User
+from .models import Product, Order, OrderItem, User
 from ml.cache import ml_cache
 from ml.manifest import ml_manifest
 from .signals import send_ml_task_notification
@@ -48,14 +49,17 @@ def rebuild_ml_indexes(self, force: bool = False) -> Dict[str, Any]:
                 }
         
         # Importer ici pour éviter les imports circulaires
-        from ml.vectorization import ProductVectorizer
+        from ml.vectorization import PRODUCT_TEXT_FIELDS, ProductVectorizer
         from ml.search import SemanticSearchEngine
         
         start_time = time.time()
         
         # Obtenir les produits actifs
-        products = Product.objects.filter(is_active=True)
-        product_count = products.count()
+        # Une seule requête : lignes brutes, cohérentes pour TF-IDF et embeddings
+        rows = list(
+            Product.objects.filter(is_active=True).values_list(*PRODUCT_TEXT_FIELDS)
+        )
+        product_count = len(rows)
         
         if product_count == 0:
             logger.warning("No active products found for ML index rebuild")
@@ -69,8 +73,9 @@ def rebuild_ml_indexes(self, force: bool = False) -> Dict[str, Any]:
         
         # Reconstruire les embeddings
         vectorizer = ProductVectorizer()
-        vectorizer.fit_tfidf(products)
-        embeddings = vectorizer.get_embeddings(products)
+        vectorizer.prepare_rows(rows)
+        vectorizer.fit_tfidf()
+        embeddings = vectorizer.get_embeddings()
         vectorizer.save_embeddings(embeddings)
         
         # Reconstruire l'index de recherche
@@ -139,7 +144,15 @@ def send_order_email(self, order_id: int) -> Dict[str, Any]:
     
     try:
         # Récupérer la commande
-        order = Order.objects.select_related('user', 'product').get(id=order_id)
+        order = Order.objects.select_related('user').prefetch_related(
+            Prefetch('items', queryset=OrderItem.objects.select_related('product'))
+        ).get(id=order_id)
+        
+        # Produits et quantités portés par les éléments de commande
+        lines = "\n".join(
+            f"        - {item.product.name} x{item.quantity} : {item.total_price}€"
+            for item in order.items.all()
+        )
         
         # Préparer le contenu de l'email
         subject = f"Confirmation de commande #{order.id}"
@@ -150,11 +163,12 @@ def send_order_email(self, order_id: int) -> Dict[str, Any]:
         
         Détails de la commande :
         - Numéro : #{order.id}
-        - Produit : {order.product.name}
-        - Quantité : {order.quantity}
-        - Prix total : {order.total_price}€
+        - Prix total : {order.total_amount}€
         - Date : {order.created_at.strftime('%d/%m/%Y %H:%M')}
         
+        Produits :
+{lines}
+        
         Merci pour votre achat !
         
         L'équipe SmartMarket
@@ -364,3 +378,35 @@ def cleanup_old_data(self, days: int = 30) -> Dict[str, Any]:
             'error': str(e),
             'task_id': task_id
         }
+
+
+@shared_task(bind=True)
+def refresh_admin_stats(self) -> Dict[str, Any]:
+    """
+    Recalcule les statistiques du tableau de bord admin et les écrit en cache.
+    
+    Returns:
+        Résultat du rafraîchissement
+    """
+    task_id = self.request.id
+    
+    try:
+        from django.core.cache import cache
+        from .admin_views import ADMIN_STATS_CACHE_KEY, compute_admin_stats
+        
+        # TTL supérieur à la période du beat pour que le cache reste chaud
+        cache.set(ADMIN_STATS_CACHE_KEY, compute_admin_stats(), 30)
+        
+        return {
+            'status': 'success',
+            'task_id': task_id,
+            'timestamp': timezone.now().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Admin stats refresh failed: {e}")
+        return {
+            'status': 'error',
+            'error': str(e),
+            'task_id': task_id
+        }
@@ -3,10 +3,13 @@ Tests pour l'API REST.
 """
 
 import json
+from datetime import timedelta
 from decimal import Decimal
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
@@ -107,6 +110,40 @@ class ProductAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.data['name'], 'Smartphone Test')
     
+    def test_detail_product_rendered_with_orjson(self):
+        """Test du rendu JSON (ORJSONRenderer) : décimaux en chaîne, UTF-8 brut."""
+        url = reverse('catalog_api:product-detail', kwargs={'pk': self.product.pk})
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/json')
+        # Sortie compacte, caractères non ASCII non échappés
+        self.assertIn('"name":"Smartphone Test"'.encode(), response.content)
+        self.assertIn('Électronique'.encode(), response.content)
+        
+        data = json.loads(response.content)
+        self.assertEqual(data['price'], '299.99')
+        self.assertEqual(data['category']['name'], 'Électronique')
+    
+    def test_orjson_renderer_types(self):
+        """Test des types convertis par ORJSONRenderer."""
+        from django.utils.translation import gettext_lazy
+        from .renderers import ORJSONRenderer
+        
+        renderer = ORJSONRenderer()
+        self.assertEqual(renderer.render(None), b'')
+        self.assertEqual(
+            json.loads(renderer.render({'price': Decimal('1.50'), 'label': gettext_lazy('Prix')})),
+            {'price': '1.50', 'label': 'Prix'}
+        )
+        
+        # Replis de l'encodeur DRF et clés non textuelles
+        data = json.loads(renderer.render({
+            1: 'un',
+            'delay': timedelta(seconds=90),
+            'tags': {'a'},
+            'ids': (i for i in range(2)),
+        }))
+        self.assertEqual(data, {'1': 'un', 'delay': '90.0', 'tags': ['a'], 'ids': [0, 1]})
+    
     def test_create_product_anonymous_forbidden(self):
         """Test de création de produit en anonyme (interdit)."""
         url = reverse('catalog_api:product-list')
@@ -342,6 +379,136 @@ class UserGDPRAPITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
 
 
+class AdminOrdersAPITest(APITestCase):
+    """Tests pour l'API des commandes d'administration."""
+    
+    def setUp(self):
+        """Crée des commandes avec leurs éléments."""
+        super().setUp()
+        self.orders = []
+        for _ in range(3):
+            order = Order.objects.create(
+                user=self.client_user,
+                total_amount=Decimal('299.99'),
+                shipping_address='123 Test Street'
+            )
+            OrderItem.objects.create(
+                order=order,
+                product=self.product,
+                quantity=1,
+                unit_price=Decimal('299.99')
+            )
+            self.orders.append(order)
+        self.client.force_login(self.admin_user)
+    
+    def get_orders(self, **params):
+        """Appelle l'API et décode la réponse diffusée en flux."""
+        response = self.client.get(reverse('catalog:admin_orders_api'), params)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, json.loads(body)
+    
+    def test_orders_cursor_mode(self):
+        """Test de la liste des commandes en mode curseur."""
+        response, data = self.get_orders()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(data['orders']), 3)
+        self.assertFalse(data['pagination']['has_next'])
+        
+        item = data['orders'][0]['items'][0]
+        self.assertEqual(item['product']['id'], self.product.pk)
+        self.assertEqual(item['quantity'], 1)
+    
+    def test_orders_exact_count_mode(self):
+        """Test de la liste des commandes avec comptage exact."""
+        response, data = self.get_orders(exact_count='1', per_page='2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(data['orders']), 2)
+        self.assertEqual(data['pagination']['total'], 3)
+        self.assertEqual(data['pagination']['pages'], 2)
+    
+    def test_orders_keyset_pagination(self):
+        """Test de la pagination par curseur (page suivante sans doublon)."""
+        response, first = self.get_orders(per_page='2')
+        self.assertTrue(first['pagination']['has_next'])
+        self.assertIsNotNone(first['pagination']['next_cursor'])
+        
+        response, second = self.get_orders(
+            per_page='2', cursor=first['pagination']['next_cursor']
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(second['pagination']['has_next'])
+        self.assertIsNone(second['pagination']['next_cursor'])
+        
+        ids = [order['id'] for order in first['orders'] + second['orders']]
+        expected = sorted((order.pk for order in self.orders), reverse=True)
+        self.assertEqual(ids, expected)
+    
+    def test_orders_invalid_cursor(self):
+        """Test d'un curseur invalide (400)."""
+        response = self.client.get(reverse('catalog:admin_orders_api'), {'cursor': 'invalide'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        
+        # Date bien formée mais impossible
+        response = self.client.get(
+            reverse('catalog:admin_orders_api'), {'cursor': '2024-13-01T00:00:00+00:00_1'}
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+    
+    def test_orders_per_page_bounded(self):
+        """Test que per_page est ramené entre 1 et le maximum."""
+        response, data = self.get_orders(per_page='0')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(data['orders']), 1)
+        self.assertEqual(data['pagination']['per_page'], 1)
+        self.assertIsNotNone(data['pagination']['next_cursor'])
+        
+        response, data = self.get_orders(per_page='-5', exact_count='1', page='0')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(data['pagination']['per_page'], 1)
+        
+        response, data = self.get_orders(per_page='1000')
+        self.assertEqual(data['pagination']['per_page'], 100)
+    
+    def test_orders_exact_count_last_page(self):
+        """Test de la dernière page en mode comptage exact (OFFSET)."""
+        response, data = self.get_orders(exact_count='1', per_page='2', page='2')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([order['id'] for order in data['orders']], [self.orders[0].pk])
+        self.assertEqual(data['pagination']['page'], 2)
+
+
+@override_settings(CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}})
+class OrderNotificationTest(APITestCase):
+    """Tests des notifications WebSocket émises par les signaux de commande."""
+    
+    def test_order_update_broadcasts_to_admins_and_user(self):
+        """Test de diffusion d'une mise à jour de commande aux deux groupes."""
+        order = Order.objects.create(
+            user=self.client_user,
+            total_amount=Decimal('299.99'),
+            shipping_address='123 Test Street'
+        )
+        
+        channel_layer = get_channel_layer()
+        user_group = f'user_{self.client_user.id}_notifications'
+        async_to_sync(channel_layer.group_add)('admin_orders', 'test.admin')
+        async_to_sync(channel_layer.group_add)(user_group, 'test.user')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'confirmed'
+            order.save()
+        
+        admin_message = async_to_sync(channel_layer.receive)('test.admin')
+        self.assertEqual(admin_message['type'], 'order_updated')
+        frame = json.loads(admin_message['frame'])
+        self.assertEqual(frame['order']['id'], order.id)
+        self.assertEqual(frame['order']['status'], 'confirmed')
+        
+        user_message = async_to_sync(channel_layer.receive)('test.user')
+        self.assertEqual(user_message['type'], 'order_status_update')
+        self.assertEqual(json.loads(user_message['frame'])['order']['id'], order.id)
+
+
 class ThrottlingTest(APITestCase):
     """Tests pour le throttling."""
     
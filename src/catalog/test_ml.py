@@ -97,6 +97,42 @@ class MLTestCase(TestCase):
         self.assertIsNone(engine.index)
         self.assertIsNone(engine.embedding_model)
     
+    def test_search_engine_product_attributes(self):
+        """Test le préchargement des attributs de filtrage."""
+        from ml.search import SemanticSearchEngine
+        
+        engine = SemanticSearchEngine()
+        engine.product_ids = [self.product1.id, self.product3.id, 999999]
+        engine.id_to_index = {pid: idx for idx, pid in enumerate(engine.product_ids)}
+        engine.load_product_attributes()
+        
+        self.assertEqual(
+            engine.category_ids_np.tolist(),
+            [self.category1.id, self.category2.id, -1]
+        )
+        self.assertAlmostEqual(engine.prices_np[1], 19.99)
+        # Produit supprimé : inactif, exclu des filtres de prix
+        self.assertEqual(engine.active_np.tolist(), [True, True, False])
+        self.assertFalse(engine.prices_np[2] >= 0)
+    
+    def test_search_engine_refreshes_product_attributes(self):
+        """Test le rechargement des attributs de filtrage après modification d'un produit."""
+        from ml.search import SemanticSearchEngine
+        
+        service = SearchEngine()
+        service.search_engine = SemanticSearchEngine()
+        service.search_engine.product_ids = [self.product1.id]
+        service.search_engine.id_to_index = {self.product1.id: 0}
+        service._refresh_product_attributes()
+        self.assertEqual(service.search_engine.category_ids_np.tolist(), [self.category1.id])
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product1.category = self.category2
+            self.product1.save()
+        
+        service._refresh_product_attributes()
+        self.assertEqual(service.search_engine.category_ids_np.tolist(), [self.category2.id])
+    
     def test_rag_service_initialization(self):
         """Test l'initialisation du service RAG."""
         from ml.rag import RAGAssistant
@@ -206,6 +242,24 @@ class MLAPITestCase(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         self.assertIn('error', response.data)
     
+    def test_semantic_search_invalid_price(self):
+        """Test l'endpoint de recherche avec un prix invalide."""
+        url = reverse('catalog_api:semantic_search')
+        response = self.client.get(url, {'q': 'smartphone', 'min_price': 'abc'})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error'], 'Prix minimum invalide')
+    
+    @patch('catalog.ml_views.search_engine._initialize')
+    def test_semantic_search_service_unavailable(self, mock_initialize):
+        """Test l'endpoint de recherche quand l'index n'a pas pu être chargé."""
+        url = reverse('catalog_api:semantic_search')
+        response = self.client.get(url, {'q': 'smartphone'})
+        
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertEqual(response['Retry-After'], '30')
+        mock_initialize.assert_called_once()
+    
     @patch('catalog.ml_views.rag_service')
     def test_rag_assistant_endpoint(self, mock_service):
         """Test l'endpoint de l'assistant RAG."""
@@ -349,6 +403,18 @@ class MLCacheTestCase(TestCase):
         
         # Ces opérations ne doivent pas lever d'exception
         self.assertTrue(True)
+    
+    def test_namespace_version_bump(self):
+        """Test l'invalidation par version des recommandations."""
+        self.cache.set('recommendations', [1, 2], product_id=1)
+        old_key = self.cache._generate_cache_key('recommendations', product_id=1)
+        
+        self.cache.bump_namespace('recommendations')
+        
+        self.assertNotEqual(
+            self.cache._generate_cache_key('recommendations', product_id=1), old_key
+        )
+        self.assertIsNone(self.cache.get('recommendations', product_id=1))
 
 
 class MLManifestTestCase(TestCase):
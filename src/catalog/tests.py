@@ -2,11 +2,19 @@
 Tests pour l'application catalog.
 """
 
+import json
+from unittest.mock import patch
+
+import msgpack
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
 from django.core.exceptions import ValidationError
-from django.test import Client, TestCase
+from django.test import Client, SimpleTestCase, TestCase, override_settings
 from django.urls import reverse
+from django.utils import timezone
 
-from .models import Category, Product
+from .consumers import AdminNotificationConsumer, serialize_frames
+from .models import Category, Product, User
 
 
 class CategoryModelTest(TestCase):
@@ -118,3 +126,88 @@ class ProductViewsTest(TestCase):
         url = reverse("catalog:product_detail", kwargs={"slug": self.product.slug})
         response = self.client.get(url)
         self.assertEqual(response.status_code, 404)
+
+
+@override_settings(
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+)
+class WebSocketFramesTest(SimpleTestCase):
+    """Tests des trames WebSocket diffusées aux admins."""
+
+    async def open_socket(self, path="/ws/admin/notifications/"):
+        """Connecte un admin au canal des notifications."""
+        communicator = WebsocketCommunicator(AdminNotificationConsumer.as_asgi(), path)
+        communicator.scope["user"] = User(username="admin", is_staff=True)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        return communicator
+
+    async def broadcast(self, *messages):
+        """Diffuse des notifications au groupe, trames sérialisées côté producteur."""
+        channel_layer = get_channel_layer()
+        for message in messages:
+            await channel_layer.group_send(
+                "admin_notifications",
+                {
+                    "type": "system_notification",
+                    **serialize_frames(
+                        "system_notification",
+                        notification={"message": message},
+                        timestamp=timezone.now(),
+                    ),
+                },
+            )
+
+    async def test_single_frame_sent_as_object(self):
+        """Test qu'une trame seule est envoyée telle quelle."""
+        communicator = await self.open_socket()
+        await self.broadcast("un")
+
+        frame = json.loads(await communicator.receive_from())
+        self.assertEqual(frame["type"], "system_notification")
+        self.assertEqual(frame["notification"]["message"], "un")
+        await communicator.disconnect()
+
+    async def test_frames_batched_in_write_window(self):
+        """Test que les trames d'une même fenêtre partent dans un seul message."""
+        with patch("catalog.consumers.WRITE_DELAY", 0.2):
+            communicator = await self.open_socket()
+            await self.broadcast("un", "deux")
+
+            frames = json.loads(await communicator.receive_from(timeout=2))
+        self.assertEqual(
+            [frame["notification"]["message"] for frame in frames], ["un", "deux"]
+        )
+        self.assertTrue(await communicator.receive_nothing())
+        await communicator.disconnect()
+
+    async def test_msgpack_frames(self):
+        """Test des trames MessagePack (?fmt=msgpack), seules puis regroupées."""
+        with patch("catalog.consumers.WRITE_DELAY", 0.2):
+            communicator = await self.open_socket("/ws/admin/notifications/?fmt=msgpack")
+            await self.broadcast("un")
+            single = await communicator.receive_output(timeout=2)
+
+            await self.broadcast("deux", "trois")
+            batched = await communicator.receive_output(timeout=2)
+
+        frame = msgpack.unpackb(single["bytes"], timestamp=3)
+        self.assertEqual(frame["notification"]["message"], "un")
+        frames = msgpack.unpackb(batched["bytes"], timestamp=3)
+        self.assertEqual(
+            [frame["notification"]["message"] for frame in frames], ["deux", "trois"]
+        )
+        await communicator.disconnect()
+
+    async def test_malformed_frames_rejected(self):
+        """Test que les messages invalides renvoient une erreur sans fermer la connexion."""
+        communicator = await self.open_socket()
+        for bytes_data in (b"\x92\x01", b"\xa2\xff\xfe", b"\x80\x01", b"\x01"):
+            await communicator.send_to(bytes_data=bytes_data)
+            frame = json.loads(await communicator.receive_from())
+            self.assertEqual(frame, {"type": "error", "message": "Invalid JSON"})
+
+        await communicator.send_to(text_data="[1, 2]")
+        frame = json.loads(await communicator.receive_from())
+        self.assertEqual(frame["type"], "error")
+        await communicator.disconnect()
@@ -81,9 +81,9 @@ class CustomLoginView(LoginView):
         
         if user.is_superuser:
             return reverse_lazy('admin:index')
-        elif user.groups.filter(name='manager').exists():
+        elif 'manager' in user.group_names:
             return reverse_lazy('catalog:manager_dashboard')
-        elif user.groups.filter(name='client').exists():
+        elif 'client' in user.group_names:
             return reverse_lazy('catalog:client_dashboard')
         else:
             return reverse_lazy('catalog:product_list')
@@ -103,7 +103,7 @@ class ManagerDashboardView(LoginRequiredMixin, TemplateView):
     
     def dispatch(self, request, *args, **kwargs):
         """Vérifie que l'utilisateur est un manager."""
-        if not (request.user.is_superuser or request.user.groups.filter(name='manager').exists()):
+        if not (request.user.is_superuser or 'manager' in request.user.group_names):
             messages.error(request, 'Accès refusé. Vous devez être manager ou admin.')
             return redirect('catalog:product_list')
         return super().dispatch(request, *args, **kwargs)
@@ -127,7 +127,7 @@ class ClientDashboardView(LoginRequiredMixin, TemplateView):
     
     def dispatch(self, request, *args, **kwargs):
         """Vérifie que l'utilisateur est un client."""
-        if not (request.user.is_superuser or request.user.groups.filter(name='client').exists()):
+        if not (request.user.is_superuser or 'client' in request.user.group_names):
             messages.error(request, 'Accès refusé. Vous devez être client ou admin.')
             return redirect('catalog:product_list')
         return super().dispatch(request, *args, **kwargs)
@@ -3,3 +3,9 @@ Module ML pour SmartMarket.
 Contient les fonctionnalités de recommandations, recherche sémantique et assistant RAG.
 """
 
+import os
+
+# Threads OpenMP (FAISS, BLAS) en attente passive entre deux appels plutôt qu'en
+# attente active : évite la contention CPU avec les autres pools de threads.
+# Doit être défini avant le premier import de faiss / numpy.
+os.environ.setdefault("OMP_WAIT_POLICY", "PASSIVE")
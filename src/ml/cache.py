@@ -2,15 +2,27 @@
 Gestion du cache Redis pour les fonctionnalités ML.
 """
 
+import logging
 import json
 import hashlib
-from typing import Any, Optional, Dict
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Dict, Tuple
 from datetime import datetime, timedelta
 
 import redis
 from django.conf import settings
 
-from .config import CACHE_TTL, CACHE_PREFIX
+from .config import (
+    CACHE_TTL,
+    CACHE_PREFIX,
+    LOCAL_CACHE_MAXSIZE,
+    LOCAL_CACHE_TTL,
+    VERSIONED_CACHE_NAMESPACES,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class MLCache:
@@ -18,8 +30,40 @@ class MLCache:
     
     def __init__(self):
         self.redis_client = None
+        # Niveau local (LRU en mémoire du processus) devant Redis pour les clés chaudes.
+        # TTL court : les invalidations faites par un autre processus ne l'atteignent pas.
+        self._local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._local_lock = threading.Lock()
         self._connect()
     
+    def _local_get(self, key: str) -> Optional[Any]:
+        """Lit une valeur du cache local (None si absente ou expirée)."""
+        with self._local_lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return None
+            
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._local[key]
+                return None
+            
+            self._local.move_to_end(key)
+            return value
+    
+    def _local_set(self, key: str, value: Any, ttl: int):
+        """Stocke une valeur dans le cache local en évinçant la moins récente."""
+        with self._local_lock:
+            self._local[key] = (time.monotonic() + min(ttl, LOCAL_CACHE_TTL), value)
+            self._local.move_to_end(key)
+            if len(self._local) > LOCAL_CACHE_MAXSIZE:
+                self._local.popitem(last=False)
+    
+    def clear_local(self):
+        """Vide le cache local du processus (ex. après rechargement des modèles)."""
+        with self._local_lock:
+            self._local.clear()
+    
     def _connect(self):
         """Établit la connexion Redis."""
         try:
@@ -36,8 +80,8 @@ class MLCache:
             # Test de connexion
             self.redis_client.ping()
             
-        except Exception as e:
-            print(f"Erreur de connexion Redis: {e}")
+        except Exception:
+            logger.exception("Erreur de connexion Redis")
             self.redis_client = None
     
     def _generate_cache_key(self, prefix: str, **kwargs) -> str:
@@ -55,8 +99,55 @@ class MLCache:
         params_str = json.dumps(kwargs, sort_keys=True)
         params_hash = hashlib.md5(params_str.encode()).hexdigest()[:8]
         
+        if prefix in VERSIONED_CACHE_NAMESPACES:
+            return f"{CACHE_PREFIX}:{prefix}:v{self.namespace_version(prefix)}:{params_hash}"
+        
         return f"{CACHE_PREFIX}:{prefix}:{params_hash}"
     
+    def namespace_version(self, namespace: str) -> int:
+        """
+        Version courante d'un espace de clés.
+        
+        Gardée dans le cache local (même borne d'obsolescence que les valeurs) :
+        pas d'aller-retour Redis supplémentaire par lecture.
+        """
+        key = f"{CACHE_PREFIX}:{namespace}:ver"
+        version = self._local_get(key)
+        if version is not None:
+            return version
+        
+        version = 0
+        if self.redis_client:
+            try:
+                version = int(self.redis_client.get(key) or 0)
+            except Exception:
+                logger.exception("Erreur lors de la lecture de version du cache")
+        
+        self._local_set(key, version, LOCAL_CACHE_TTL)
+        return version
+    
+    def bump_namespace(self, namespace: str):
+        """
+        Invalide toutes les clés d'un espace versionné en O(1) (INCR).
+        
+        Les anciennes clés ne sont plus lues et expirent avec leur TTL.
+        
+        Args:
+            namespace: Espace de clés (VERSIONED_CACHE_NAMESPACES)
+        """
+        key = f"{CACHE_PREFIX}:{namespace}:ver"
+        version = None
+        if self.redis_client:
+            try:
+                version = self.redis_client.incr(key)
+            except Exception:
+                logger.exception("Erreur lors de l'incrément de version du cache")
+        
+        if version is None:
+            # Sans Redis, seule la version locale du processus avance
+            version = self.namespace_version(namespace) + 1
+        self._local_set(key, version, LOCAL_CACHE_TTL)
+    
     def get(self, prefix: str, **kwargs) -> Optional[Any]:
         """
         Récupère une valeur du cache.
@@ -66,20 +157,26 @@ class MLCache:
             **kwargs: Paramètres pour la clé
             
         Returns:
-            Valeur en cache ou None
+            Valeur en cache ou None (partagée avec le cache local : ne pas la modifier)
         """
+        key = self._generate_cache_key(prefix, **kwargs)
+        value = self._local_get(key)
+        if value is not None:
+            return value
+        
         if not self.redis_client:
             return None
         
         try:
-            key = self._generate_cache_key(prefix, **kwargs)
             value = self.redis_client.get(key)
             
             if value:
-                return json.loads(value)
+                value = json.loads(value)
+                self._local_set(key, value, LOCAL_CACHE_TTL)
+                return value
             
-        except Exception as e:
-            print(f"Erreur lors de la récupération du cache: {e}")
+        except Exception:
+            logger.exception("Erreur lors de la récupération du cache")
         
         return None
     
@@ -93,17 +190,19 @@ class MLCache:
             ttl: Time to live en secondes
             **kwargs: Paramètres pour la clé
         """
+        key = self._generate_cache_key(prefix, **kwargs)
+        self._local_set(key, value, ttl)
+        
         if not self.redis_client:
             return
         
         try:
-            key = self._generate_cache_key(prefix, **kwargs)
             serialized_value = json.dumps(value, default=str)
             
             self.redis_client.setex(key, ttl, serialized_value)
             
-        except Exception as e:
-            print(f"Erreur lors du stockage en cache: {e}")
+        except Exception:
+            logger.exception("Erreur lors du stockage en cache")
     
     def delete(self, prefix: str, **kwargs):
         """
@@ -113,15 +212,18 @@ class MLCache:
             prefix: Préfixe de la clé
             **kwargs: Paramètres pour la clé
         """
+        key = self._generate_cache_key(prefix, **kwargs)
+        with self._local_lock:
+            self._local.pop(key, None)
+        
         if not self.redis_client:
             return
         
         try:
-            key = self._generate_cache_key(prefix, **kwargs)
             self.redis_client.delete(key)
             
-        except Exception as e:
-            print(f"Erreur lors de la suppression du cache: {e}")
+        except Exception:
+            logger.exception("Erreur lors de la suppression du cache")
     
     def delete_pattern(self, pattern: str):
         """
@@ -130,6 +232,9 @@ class MLCache:
         Args:
             pattern: Pattern des clés à supprimer
         """
+        # Les clés locales sont hachées : pas de filtrage possible, tout vider
+        self.clear_local()
+        
         if not self.redis_client:
             return
         
@@ -140,8 +245,8 @@ class MLCache:
             if keys:
                 self.redis_client.delete(*keys)
                 
-        except Exception as e:
-            print(f"Erreur lors de la suppression par pattern: {e}")
+        except Exception:
+            logger.exception("Erreur lors de la suppression par pattern")
     
     def invalidate_product_cache(self, product_id: int):
         """
@@ -156,8 +261,38 @@ class MLCache:
         # Invalider les embeddings du produit
         self.delete_pattern(f"product_embedding:*product_id={product_id}*")
     
+    def invalidate_products_cache(self, product_ids):
+        """
+        Invalide le cache de plusieurs produits en une passe.
+        
+        Équivaut à invalidate_product_cache pour chaque produit suivi d'une
+        invalidation des résultats classés, avec un nombre de suppressions par
+        pattern fixe au lieu de deux par produit.
+        
+        Args:
+            product_ids: IDs des produits modifiés
+        """
+        if not product_ids:
+            return
+        
+        # Les recommandations couvrent les patterns par produit
+        self.invalidate_ranked_results()
+        self.delete_pattern("product_embedding:*")
+    
+    def invalidate_ranked_results(self):
+        """
+        Invalide les recommandations et recherches en cache.
+        
+        Ces résultats embarquent les données produit (prix, stock) : à appeler
+        une fois après une mise à jour groupée de produits.
+        """
+        for namespace in VERSIONED_CACHE_NAMESPACES:
+            self.bump_namespace(namespace)
+    
     def invalidate_all_cache(self):
         """Invalide tout le cache ML."""
+        self.clear_local()
+        
         if not self.redis_client:
             return
         
@@ -168,8 +303,8 @@ class MLCache:
             if keys:
                 self.redis_client.delete(*keys)
                 
-        except Exception as e:
-            print(f"Erreur lors de l'invalidation complète du cache: {e}")
+        except Exception:
+            logger.exception("Erreur lors de l'invalidation complète du cache")
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """
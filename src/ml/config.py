@@ -13,12 +13,22 @@ ML_ARTIFACTS_DIR.mkdir(parents=True, exist_ok=True)
 # Configuration des modèles
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 EMBEDDING_DIMENSION = 384
+EMBEDDING_BATCH_SIZE = 64  # Textes encodés par appel au modèle
+PRODUCT_CHUNK_SIZE = 2000  # Produits lus / encodés par lot
 
 # Configuration des index
 FAISS_INDEX_PATH = ML_ARTIFACTS_DIR / "faiss_index.bin"
 TFIDF_MODEL_PATH = ML_ARTIFACTS_DIR / "tfidf_model.pkl"
 PRODUCT_EMBEDDINGS_PATH = ML_ARTIFACTS_DIR / "product_embeddings.npy"
 RAG_INDEX_PATH = ML_ARTIFACTS_DIR / "rag_index.bin"
+RAG_EMBEDDING_CACHE_PATH = ML_ARTIFACTS_DIR / "rag_embedding_cache.npz"
+RAG_DEMO_DOCUMENTS_PATH = BASE_DIR / "data" / "rag" / "demo.jsonl"
+
+# Index approché HNSW au-delà de ce nombre de produits (recherche exacte en dessous)
+FAISS_HNSW_THRESHOLD = 50_000
+FAISS_HNSW_M = 32  # Voisins par nœud du graphe
+FAISS_HNSW_EF_CONSTRUCTION = 200
+FAISS_HNSW_EF_SEARCH = 64  # Compromis rappel / latence à la requête
 
 # Configuration des recommandations
 DEFAULT_RECOMMENDATIONS_K = 10
@@ -32,10 +42,17 @@ MAX_SEARCH_K = 100
 RAG_CHUNK_SIZE = 500
 RAG_CHUNK_OVERLAP = 50
 RAG_TOP_K = 5
+RAG_GPU_BATCH_SIZE = 256  # Lots plus grands quand l'encodage tourne sur GPU
+RAG_IVF_THRESHOLD = 10_000  # Index IVF au-delà de ce nombre de chunks (exact en dessous)
+RAG_IVF_NPROBE = 16  # Listes IVF parcourues par requête
 
 # Configuration du cache
 CACHE_TTL = 3600  # 1 heure
 CACHE_PREFIX = "smartmarket_ml"
+LOCAL_CACHE_MAXSIZE = 4096  # Entrées gardées en mémoire par processus
+LOCAL_CACHE_TTL = 30  # Secondes (borne l'obsolescence entre processus)
+# Espaces de clés invalidés par incrément de version (INCR) plutôt que par pattern
+VERSIONED_CACHE_NAMESPACES = ("recommendations", "search")
 
 # Configuration des performances
 RECOMMENDATION_TIMEOUT = 0.15  # 150ms
@@ -2,6 +2,7 @@
 Manifest et versioning des artefacts ML.
 """
 
+import logging
 import json
 from datetime import datetime
 from pathlib import Path
@@ -9,6 +10,8 @@ from typing import Dict, Any, Optional
 
 from .config import ML_ARTIFACTS_DIR
 
+logger = logging.getLogger(__name__)
+
 
 class MLManifest:
     """Gestionnaire du manifest des artefacts ML."""
@@ -23,8 +26,8 @@ class MLManifest:
             try:
                 with open(self.manifest_path, 'r', encoding='utf-8') as f:
                     return json.load(f)
-            except Exception as e:
-                print(f"Erreur lors du chargement du manifest: {e}")
+            except Exception:
+                logger.exception("Erreur lors du chargement du manifest")
         
         return {
             "version": "1.0.0",
@@ -43,8 +46,8 @@ class MLManifest:
             with open(self.manifest_path, 'w', encoding='utf-8') as f:
                 json.dump(self.manifest_data, f, indent=2, ensure_ascii=False)
                 
-        except Exception as e:
-            print(f"Erreur lors de la sauvegarde du manifest: {e}")
+        except Exception:
+            logger.exception("Erreur lors de la sauvegarde du manifest")
     
     def register_artifact(
         self,
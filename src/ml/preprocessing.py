@@ -126,6 +126,29 @@ def create_product_text(product) -> str:
     Args:
         product: Instance du modèle Product
         
+    Returns:
+        Texte composite du produit
+    """
+    category_name = product.category.name if product.category else None
+    return build_product_text(product.name, category_name, product.description)
+
+
+def build_product_text(
+    name: Optional[str],
+    category_name: Optional[str],
+    description: Optional[str]
+) -> str:
+    """
+    Crée le texte composite d'un produit à partir de ses champs bruts.
+    
+    Permet de vectoriser des lignes issues de values_list() sans instancier
+    de modèles.
+    
+    Args:
+        name: Nom du produit
+        category_name: Nom de la catégorie
+        description: Description du produit
+        
     Returns:
         Texte composite du produit
     """
@@ -138,19 +161,18 @@ def create_product_text(product) -> str:
     text_parts = []
     
     # Titre (pondéré)
-    if product.name:
-        text_parts.extend([product.name] * title_weight)
+    if name:
+        text_parts.extend([name] * title_weight)
     
     # Catégorie (pondéré)
-    if product.category and product.category.name:
-        text_parts.extend([product.category.name] * category_weight)
+    if category_name:
+        text_parts.extend([category_name] * category_weight)
     
     # Description (pondérée)
-    if product.description:
-        text_parts.extend([product.description] * description_weight)
+    if description:
+        text_parts.extend([description] * description_weight)
     
     # Combiner tous les éléments
     combined_text = " ".join(text_parts)
     
     return preprocess_text(combined_text, stem=True)
-
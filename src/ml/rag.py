@@ -2,9 +2,15 @@
 Assistant RAG (Retrieval-Augmented Generation) pour SmartMarket.
 """
 
+import asyncio
+import hashlib
+import itertools
 import json
+import logging
+import math
+import pickle
 import uuid
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Set, Tuple
 from datetime import datetime
 import numpy as np
 import faiss
@@ -12,15 +18,22 @@ from sentence_transformers import SentenceTransformer
 
 from .config import (
     RAG_INDEX_PATH,
+    RAG_EMBEDDING_CACHE_PATH,
     RAG_CHUNK_SIZE,
     RAG_CHUNK_OVERLAP,
     RAG_TOP_K,
     EMBEDDING_MODEL,
+    EMBEDDING_BATCH_SIZE,
+    RAG_GPU_BATCH_SIZE,
+    RAG_IVF_THRESHOLD,
+    RAG_IVF_NPROBE,
     OPENAI_API_KEY,
     OPENAI_MODEL,
     OPENAI_MAX_TOKENS,
 )
 
+logger = logging.getLogger(__name__)
+
 
 class RAGDocument:
     """Représente un document pour le RAG."""
@@ -107,20 +120,159 @@ class RAGChunker:
 class RAGIndex:
     """Index vectoriel pour le RAG."""
     
-    def __init__(self):
+    def __init__(self, device: Optional[str] = None):
         self.index: Optional[faiss.Index] = None
         self.embedding_model: Optional[SentenceTransformer] = None
         self.documents: List[RAGDocument] = []
         self.document_embeddings: Optional[np.ndarray] = None
         self.chunker = RAGChunker()
+        self.chunk_hashes: Set[bytes] = set()  # Empreintes des chunks déjà indexés
+        self.embedding_cache: Optional[Dict[bytes, np.ndarray]] = None
+        self.use_bf16 = False
+        self.device = device
+    
+    def _resolve_device(self) -> str:
+        """Retourne le device d'inférence ('auto' ou None : GPU si disponible)."""
+        if self.device not in (None, 'auto'):
+            return self.device
+        
+        import torch
+        return 'cuda' if torch.cuda.is_available() else 'cpu'
     
     def load_embedding_model(self):
         """Charge le modèle d'embeddings."""
         try:
-            self.embedding_model = SentenceTransformer(EMBEDDING_MODEL)
-        except Exception as e:
-            print(f"Erreur lors du chargement du modèle d'embeddings: {e}")
+            self.device = self._resolve_device()
+            self.embedding_model = SentenceTransformer(EMBEDDING_MODEL, device=self.device)
+        except Exception:
+            logger.exception("Erreur lors du chargement du modèle d'embeddings")
             self.embedding_model = None
+            return
+        
+        if self.device == 'cpu':
+            self._enable_bf16()
+    
+    def _enable_bf16(self):
+        """Active l'inférence BF16 sur CPU si Intel Extension for PyTorch est installé."""
+        self.use_bf16 = False
+        try:
+            import torch
+            import intel_extension_for_pytorch as ipex
+        except ImportError:
+            return  # Inférence FP32 par défaut
+        
+        try:
+            transformer = self.embedding_model[0]
+            transformer.auto_model = ipex.optimize(
+                transformer.auto_model.eval(), dtype=torch.bfloat16
+            )
+            self.use_bf16 = True
+        except Exception as e:
+            logger.warning("BF16 indisponible, inférence FP32: %s", e)
+    
+    def _encode(self, texts: List[str], **kwargs) -> np.ndarray:
+        """Encode des textes en float32, via BF16 si activé."""
+        if not self.use_bf16:
+            return self.embedding_model.encode(texts, convert_to_numpy=True, **kwargs).astype('float32')
+        
+        import torch
+        with torch.no_grad(), torch.cpu.amp.autocast(dtype=torch.bfloat16):
+            embeddings = self.embedding_model.encode(texts, convert_to_tensor=True, **kwargs)
+        # numpy ne gère pas le bfloat16 : repasser en float32 avant conversion
+        return embeddings.float().cpu().numpy()
+    
+    def _load_embedding_cache(self) -> Dict[bytes, np.ndarray]:
+        """Charge le cache disque empreinte -> embedding (vide si absent)."""
+        if self.embedding_cache is None:
+            self.embedding_cache = {}
+            if RAG_EMBEDDING_CACHE_PATH.exists():
+                with np.load(RAG_EMBEDDING_CACHE_PATH) as data:
+                    self.embedding_cache = {
+                        digest.tobytes(): embedding
+                        for digest, embedding in zip(data['digests'], data['embeddings'])
+                    }
+        return self.embedding_cache
+    
+    def _embed_chunks(self, chunks: List[RAGDocument], digests: List[bytes]) -> np.ndarray:
+        """
+        Retourne les embeddings normalisés (float32) des chunks.
+        
+        Seuls les chunks absents du cache sont tokenisés et encodés : une
+        reconstruction (--force) d'un corpus inchangé ne relance pas le modèle.
+        """
+        cache = self._load_embedding_cache()
+        missing = [i for i, digest in enumerate(digests) if digest not in cache]
+        
+        if missing:
+            # Générer les embeddings manquants (lots de EMBEDDING_BATCH_SIZE)
+            texts = [chunks[i].content for i in missing]
+            batch_size = RAG_GPU_BATCH_SIZE if self.device == 'cuda' else EMBEDDING_BATCH_SIZE
+            # Un seul appel séquentiel : le tokenizer rapide HF n'est pas utilisable
+            # depuis plusieurs threads et torch parallélise déjà chaque lot
+            encoded = self._encode(texts, batch_size=batch_size, show_progress_bar=False)
+            faiss.normalize_L2(encoded)
+            for i, embedding in zip(missing, encoded.astype(np.float16)):
+                cache[digests[i]] = embedding
+        
+        # Matrice préallouée, remplie depuis le cache (un seul index.add ensuite)
+        embeddings = np.empty((len(digests), len(cache[digests[0]])), dtype=np.float32)
+        for row, digest in enumerate(digests):
+            embeddings[row] = cache[digest]
+        
+        # Normaliser avant l'ajout : le produit scalaire devient la similarité cosinus
+        faiss.normalize_L2(embeddings)
+        return embeddings
+    
+    def _save_embedding_cache(self):
+        """Sauvegarde le cache empreinte -> embedding."""
+        if not self.embedding_cache:
+            return
+        
+        np.savez(
+            RAG_EMBEDDING_CACHE_PATH,
+            # uint8 plutôt que 'S16' : numpy tronquerait les octets nuls finaux
+            digests=np.frombuffer(b''.join(self.embedding_cache), dtype=np.uint8).reshape(-1, 16),
+            embeddings=np.stack(list(self.embedding_cache.values())),
+        )
+    
+    def _create_index(self, embeddings: np.ndarray) -> faiss.Index:
+        """
+        Crée l'index FAISS adapté à la taille du corpus.
+        
+        Recherche exhaustive en dessous de RAG_IVF_THRESHOLD chunks ; au-delà,
+        index IVF (quantiseur HNSW, entraîné sur le premier lot) qui ne parcourt
+        que RAG_IVF_NPROBE listes par requête.
+        
+        Args:
+            embeddings: Embeddings normalisés du premier lot
+            
+        Returns:
+            Index FAISS prêt à recevoir des vecteurs
+        """
+        count, dimension = embeddings.shape
+        if count < RAG_IVF_THRESHOLD:
+            return faiss.IndexScalarQuantizer(
+                dimension, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+            )
+        
+        nlist = min(4096, 4 * int(math.sqrt(count)))
+        quantizer = faiss.IndexHNSWFlat(dimension, 32, faiss.METRIC_INNER_PRODUCT)
+        index = faiss.IndexIVFScalarQuantizer(
+            quantizer, dimension, nlist, faiss.ScalarQuantizer.QT_fp16, faiss.METRIC_INNER_PRODUCT
+        )
+        index.train(embeddings)
+        index.nprobe = RAG_IVF_NPROBE
+        return index
+    
+    @property
+    def index_type(self) -> Optional[str]:
+        """Nom de la classe FAISS de l'index chargé."""
+        return type(self.index).__name__ if self.index is not None else None
+    
+    @property
+    def is_ivf(self) -> bool:
+        """Index IVF : seul type dont load_index projette les données en mmap."""
+        return isinstance(self.index, faiss.IndexIVF)
     
     def add_documents(self, documents: List[RAGDocument]):
         """
@@ -132,37 +284,40 @@ class RAGIndex:
         if not self.embedding_model:
             raise ValueError("Modèle d'embeddings non chargé")
         
-        # Découper les documents
+        # Découper tous les documents, sans ré-encoder un contenu déjà indexé
         all_chunks = []
-        for doc in documents:
-            chunks = self.chunker.chunk_document(doc)
-            all_chunks.extend(chunks)
+        digests = []
+        for chunk in itertools.chain.from_iterable(
+            self.chunker.chunk_document(doc) for doc in documents
+        ):
+            digest = hashlib.blake2b(chunk.content.encode('utf-8'), digest_size=16).digest()
+            if digest in self.chunk_hashes:
+                continue
+            self.chunk_hashes.add(digest)
+            all_chunks.append(chunk)
+            digests.append(digest)
         
         if not all_chunks:
             return
         
-        # Générer les embeddings
-        chunk_texts = [chunk.content for chunk in all_chunks]
-        embeddings = self.embedding_model.encode(
-            chunk_texts,
-            show_progress_bar=True,
-            convert_to_numpy=True
-        )
+        embeddings = self._embed_chunks(all_chunks, digests)
         
-        # Créer ou mettre à jour l'index
+        # Copie conservée (et sauvegardée) en float16 : moitié moins de mémoire
+        embeddings_fp16 = embeddings.astype(np.float16)
+        
+        # Créer ou mettre à jour l'index (vecteurs stockés en float16 par FAISS)
         if self.index is None:
-            self.index = faiss.IndexFlatIP(embeddings.shape[1])
+            self.index = self._create_index(embeddings)
             self.documents = []
-            self.document_embeddings = embeddings
+            self.document_embeddings = embeddings_fp16
         else:
-            self.document_embeddings = np.vstack([self.document_embeddings, embeddings])
-            self.index.add(embeddings.astype('float32'))
+            self.document_embeddings = np.vstack([self.document_embeddings, embeddings_fp16])
+        
+        # Un seul ajout FAISS pour tout le lot
+        self.index.add(embeddings)
         
         # Ajouter les documents
         self.documents.extend(all_chunks)
-        
-        # Normaliser les embeddings pour la similarité cosinus
-        faiss.normalize_L2(self.document_embeddings)
     
     def search(self, query: str, k: int = RAG_TOP_K) -> List[Tuple[RAGDocument, float]]:
         """
@@ -179,11 +334,11 @@ class RAGIndex:
             raise ValueError("Index ou modèle d'embeddings non chargé")
         
         # Générer l'embedding de la requête
-        query_embedding = self.embedding_model.encode([query])
+        query_embedding = self._encode([query])
         faiss.normalize_L2(query_embedding)
         
         # Rechercher dans l'index
-        scores, indices = self.index.search(query_embedding.astype('float32'), k)
+        scores, indices = self.index.search(query_embedding, k)
         
         # Formater les résultats
         results = []
@@ -215,15 +370,30 @@ class RAGIndex:
         if self.document_embeddings is not None:
             embeddings_path = RAG_INDEX_PATH.with_suffix('.embeddings.npy')
             np.save(embeddings_path, self.document_embeddings)
+        
+        # Sauvegarder les empreintes des chunks (reconstruction incrémentale)
+        with open(RAG_INDEX_PATH.with_suffix('.hashes.pkl'), 'wb') as f:
+            pickle.dump(self.chunk_hashes, f)
+        
+        self._save_embedding_cache()
     
-    def load_index(self):
-        """Charge l'index et les documents."""
+    def load_index(self, mmap: bool = True):
+        """
+        Charge l'index et les documents.
+        
+        Args:
+            mmap: Lecture seule avec IO_FLAG_MMAP. FAISS ne projette que les listes
+                inversées d'un index IVF (l'OS ne charge que les pages consultées) ;
+                l'index plat des petits corpus est lu entièrement en mémoire.
+                Passer False pour ajouter des documents ensuite.
+        """
         if not RAG_INDEX_PATH.exists():
             return False
         
         try:
             # Charger l'index FAISS
-            self.index = faiss.read_index(str(RAG_INDEX_PATH))
+            io_flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+            self.index = faiss.read_index(str(RAG_INDEX_PATH), io_flags)
             
             # Charger les documents
             documents_path = RAG_INDEX_PATH.with_suffix('.documents.json')
@@ -243,18 +413,25 @@ class RAGIndex:
             if embeddings_path.exists():
                 self.document_embeddings = np.load(embeddings_path)
             
+            # Charger les empreintes des chunks
+            hashes_path = RAG_INDEX_PATH.with_suffix('.hashes.pkl')
+            if hashes_path.exists():
+                with open(hashes_path, 'rb') as f:
+                    self.chunk_hashes = pickle.load(f)
+            
             return True
-        except Exception as e:
-            print(f"Erreur lors du chargement de l'index RAG: {e}")
+        except Exception:
+            logger.exception("Erreur lors du chargement de l'index RAG")
             return False
 
 
 class RAGAssistant:
     """Assistant RAG pour SmartMarket."""
     
-    def __init__(self):
-        self.rag_index = RAGIndex()
+    def __init__(self, device: Optional[str] = None):
+        self.rag_index = RAGIndex(device=device)
         self.openai_client = None
+        self.async_openai_client = None
         self._setup_openai()
     
     def _setup_openai(self):
@@ -263,10 +440,12 @@ class RAGAssistant:
             try:
                 import openai
                 self.openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+                # Client asynchrone (httpx.AsyncClient) pour aask sous ASGI
+                self.async_openai_client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
             except ImportError:
-                print("OpenAI non installé. L'assistant RAG ne fonctionnera pas.")
-            except Exception as e:
-                print(f"Erreur lors de la configuration d'OpenAI: {e}")
+                logger.warning("OpenAI non installé. L'assistant RAG ne fonctionnera pas.")
+            except Exception:
+                logger.exception("Erreur lors de la configuration d'OpenAI")
     
     def load_index(self):
         """Charge l'index RAG."""
@@ -302,13 +481,7 @@ class RAGAssistant:
             relevant_docs = self.rag_index.search(question, k=RAG_TOP_K)
             
             if not relevant_docs:
-                return {
-                    'answer': "Je n'ai pas trouvé d'informations pertinentes pour répondre à votre question dans notre base de connaissances.",
-                    'sources': [],
-                    'trace_id': trace_id,
-                    'confidence': 0.0,
-                    'status': 'no_sources'
-                }
+                return self._no_sources_response(trace_id)
             
             # Construire le contexte
             context = self._build_context(relevant_docs)
@@ -319,33 +492,90 @@ class RAGAssistant:
             else:
                 answer = self._generate_simple_answer(question, relevant_docs)
             
-            # Préparer les sources
-            sources = [
-                {
-                    'content': doc.content[:200] + '...' if len(doc.content) > 200 else doc.content,
-                    'metadata': doc.metadata,
-                    'score': score
-                }
-                for doc, score in relevant_docs
-            ]
-            
-            return {
-                'answer': answer,
-                'sources': sources,
-                'trace_id': trace_id,
-                'confidence': relevant_docs[0][1] if relevant_docs else 0.0,
-                'status': 'success'
-            }
+            return self._success_response(answer, relevant_docs, trace_id)
+            
+        except Exception as e:
+            return self._error_response(trace_id, e)
+    
+    async def aask(self, question: str, user_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Variante asynchrone de ask (vues ASGI).
+        
+        L'encodage de la question et la recherche FAISS (CPU) partent dans un
+        thread ; l'appel au LLM est attendu sans bloquer la boucle d'événements.
+        
+        Args:
+            question: Question de l'utilisateur
+            user_context: Contexte utilisateur (optionnel)
+            
+        Returns:
+            Dictionnaire avec la réponse et les métadonnées
+        """
+        trace_id = str(uuid.uuid4())
+        
+        try:
+            relevant_docs = await asyncio.to_thread(self.rag_index.search, question, RAG_TOP_K)
+            
+            if not relevant_docs:
+                return self._no_sources_response(trace_id)
+            
+            context = self._build_context(relevant_docs)
+            
+            if self.async_openai_client:
+                answer = await self._agenerate_answer_with_llm(question, context)
+            else:
+                answer = self._generate_simple_answer(question, relevant_docs)
+            
+            return self._success_response(answer, relevant_docs, trace_id)
             
         except Exception as e:
-            return {
-                'answer': "Une erreur s'est produite lors du traitement de votre question.",
-                'sources': [],
-                'trace_id': trace_id,
-                'confidence': 0.0,
-                'status': 'error',
-                'error': str(e)
+            return self._error_response(trace_id, e)
+    
+    def _no_sources_response(self, trace_id: str) -> Dict[str, Any]:
+        """Réponse lorsqu'aucun document pertinent n'a été trouvé."""
+        return {
+            'answer': "Je n'ai pas trouvé d'informations pertinentes pour répondre à votre question dans notre base de connaissances.",
+            'sources': [],
+            'trace_id': trace_id,
+            'confidence': 0.0,
+            'status': 'no_sources'
+        }
+    
+    def _success_response(
+        self,
+        answer: str,
+        relevant_docs: List[Tuple[RAGDocument, float]],
+        trace_id: str
+    ) -> Dict[str, Any]:
+        """Réponse avec la réponse générée et ses sources."""
+        # Préparer les sources
+        sources = [
+            {
+                'content': doc.content[:200] + '...' if len(doc.content) > 200 else doc.content,
+                'metadata': doc.metadata,
+                'score': score
             }
+            for doc, score in relevant_docs
+        ]
+        
+        return {
+            'answer': answer,
+            'sources': sources,
+            'trace_id': trace_id,
+            'confidence': relevant_docs[0][1] if relevant_docs else 0.0,
+            'status': 'success'
+        }
+    
+    def _error_response(self, trace_id: str, error: Exception) -> Dict[str, Any]:
+        """Réponse en cas d'erreur pendant le traitement de la question."""
+        return {
+            'answer': "Une erreur s'est produite lors du traitement de votre question.",
+            'sources': [],
+            'trace_id': trace_id,
+            'confidence': 0.0,
+            'status': 'error',
+            'error': str(error)
+        }
     
     def _build_context(self, relevant_docs: List[Tuple[RAGDocument, float]]) -> str:
         """
@@ -379,7 +609,50 @@ class RAGAssistant:
             return self._generate_simple_answer(question, [])
         
         try:
-            prompt = f"""Tu es un assistant d'aide à l'achat pour SmartMarket, un site e-commerce.
+            response = self.openai_client.chat.completions.create(
+                **self._llm_request(question, context)
+            )
+            
+            return response.choices[0].message.content.strip()
+            
+        except Exception:
+            logger.exception("Erreur lors de la génération de réponse")
+            return self._generate_simple_answer(question, [])
+    
+    async def _agenerate_answer_with_llm(self, question: str, context: str) -> str:
+        """
+        Variante asynchrone de _generate_answer_with_llm.
+        
+        Args:
+            question: Question de l'utilisateur
+            context: Contexte des documents
+            
+        Returns:
+            Réponse générée
+        """
+        try:
+            response = await self.async_openai_client.chat.completions.create(
+                **self._llm_request(question, context)
+            )
+            
+            return response.choices[0].message.content.strip()
+            
+        except Exception:
+            logger.exception("Erreur lors de la génération de réponse")
+            return self._generate_simple_answer(question, [])
+    
+    def _llm_request(self, question: str, context: str) -> Dict[str, Any]:
+        """
+        Construit les paramètres de l'appel chat.completions.
+        
+        Args:
+            question: Question de l'utilisateur
+            context: Contexte des documents
+            
+        Returns:
+            Paramètres de la requête au LLM
+        """
+        prompt = f"""Tu es un assistant d'aide à l'achat pour SmartMarket, un site e-commerce.
 
 Contexte (informations de la base de connaissances):
 {context}
@@ -395,20 +668,14 @@ Instructions:
 
 Réponse:"""
 
-            response = self.openai_client.chat.completions.create(
-                model=OPENAI_MODEL,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=OPENAI_MAX_TOKENS,
-                temperature=0.3
-            )
-            
-            return response.choices[0].message.content.strip()
-            
-        except Exception as e:
-            print(f"Erreur lors de la génération de réponse: {e}")
-            return self._generate_simple_answer(question, [])
+        return {
+            'model': OPENAI_MODEL,
+            'messages': [
+                {"role": "user", "content": prompt}
+            ],
+            'max_tokens': OPENAI_MAX_TOKENS,
+            'temperature': 0.3,
+        }
     
     def _generate_simple_answer(self, question: str, relevant_docs: List[Tuple[RAGDocument, float]]) -> str:
         """
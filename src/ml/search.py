@@ -12,6 +12,10 @@ from .config import (
     DEFAULT_SEARCH_K,
     MAX_SEARCH_K,
     EMBEDDING_DIMENSION,
+    FAISS_HNSW_THRESHOLD,
+    FAISS_HNSW_M,
+    FAISS_HNSW_EF_CONSTRUCTION,
+    FAISS_HNSW_EF_SEARCH,
 )
 from .preprocessing import preprocess_text
 
@@ -24,6 +28,10 @@ class SemanticSearchEngine:
         self.product_ids: List[int] = []
         self.id_to_index: Dict[int, int] = {}
         self.embedding_model = None
+        # Attributs de filtrage alignés sur product_ids (structure de tableaux)
+        self.category_ids_np: Optional[np.ndarray] = None
+        self.prices_np: Optional[np.ndarray] = None
+        self.active_np: Optional[np.ndarray] = None
     
     def load_embedding_model(self, embedding_model):
         """
@@ -45,14 +53,19 @@ class SemanticSearchEngine:
         if embeddings.shape[1] != EMBEDDING_DIMENSION:
             raise ValueError(f"Dimension d'embedding incorrecte: {embeddings.shape[1]} != {EMBEDDING_DIMENSION}")
         
-        # Créer l'index FAISS
-        self.index = faiss.IndexFlatIP(EMBEDDING_DIMENSION)  # Inner Product (cosine similarity)
+        # Créer l'index FAISS (Inner Product = similarité cosinus après normalisation)
+        self.index = self._create_index(len(product_ids))
         
         # Normaliser les embeddings pour la similarité cosinus
+        embeddings = np.ascontiguousarray(embeddings, dtype='float32')
         faiss.normalize_L2(embeddings)
         
+        # Le quantificateur 8 bits apprend les bornes de chaque dimension
+        if not self.index.is_trained:
+            self.index.train(embeddings)
+        
         # Ajouter les embeddings à l'index
-        self.index.add(embeddings.astype('float32'))
+        self.index.add(embeddings)
         
         # Sauvegarder les métadonnées
         self.product_ids = product_ids
@@ -61,6 +74,41 @@ class SemanticSearchEngine:
         # Sauvegarder l'index
         self.save_index()
     
+    def _create_index(self, product_count: int) -> faiss.Index:
+        """
+        Crée l'index FAISS adapté à la taille du catalogue.
+        
+        Recherche exhaustive pour les petits catalogues ; au-delà de
+        FAISS_HNSW_THRESHOLD produits, graphe HNSW dont la recherche est
+        logarithmique au lieu d'un parcours O(N·d) par requête.
+        
+        Les vecteurs sont stockés quantifiés sur 8 bits (4x moins de mémoire
+        parcourue par requête qu'en float32).
+        
+        Args:
+            product_count: Nombre de produits à indexer
+            
+        Returns:
+            Index FAISS vide
+        """
+        if product_count < FAISS_HNSW_THRESHOLD:
+            return faiss.IndexScalarQuantizer(
+                EMBEDDING_DIMENSION, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+        
+        index = faiss.IndexHNSWSQ(
+            EMBEDDING_DIMENSION, faiss.ScalarQuantizer.QT_8bit, FAISS_HNSW_M,
+            faiss.METRIC_INNER_PRODUCT
+        )
+        index.hnsw.efConstruction = FAISS_HNSW_EF_CONSTRUCTION
+        index.hnsw.efSearch = FAISS_HNSW_EF_SEARCH
+        return index
+    
+    @property
+    def index_type(self) -> Optional[str]:
+        """Nom de la classe FAISS de l'index chargé."""
+        return type(self.index).__name__ if self.index is not None else None
+    
     def load_index(self):
         """Charge l'index FAISS sauvegardé."""
         if not FAISS_INDEX_PATH.exists():
@@ -80,6 +128,36 @@ class SemanticSearchEngine:
             self.product_ids = []
             self.id_to_index = {}
     
+    def load_product_attributes(self):
+        """
+        Précharge catégorie, prix et statut des produits indexés en tableaux NumPy.
+        
+        Une seule requête : search_with_filters applique ensuite ses filtres par
+        masque vectorisé, sans aller-retour en base par recherche. À rappeler
+        quand les produits changent (voir catalog.ml_views.SearchEngine).
+        """
+        # Importer ici pour éviter les imports circulaires
+        from catalog.models import Product
+        
+        count = len(self.product_ids)
+        # Produits supprimés depuis la construction de l'index : exclus par les filtres
+        category_ids = np.full(count, -1, dtype=np.int64)
+        prices = np.full(count, np.nan, dtype=np.float64)
+        active = np.zeros(count, dtype=bool)
+        
+        rows = Product.objects.filter(id__in=self.product_ids).values_list(
+            'id', 'category_id', 'price', 'is_active'
+        )
+        for product_id, category_id, price, is_active in rows.iterator():
+            idx = self.id_to_index[product_id]
+            category_ids[idx] = category_id
+            prices[idx] = price
+            active[idx] = is_active
+        
+        # Remplacement en bloc : une recherche concurrente ne voit jamais de
+        # tableaux partiellement rechargés
+        self.category_ids_np, self.prices_np, self.active_np = category_ids, prices, active
+    
     def save_index(self):
         """Sauvegarde l'index FAISS et ses métadonnées."""
         if self.index is None:
@@ -101,7 +179,8 @@ class SemanticSearchEngine:
         self,
         query: str,
         k: int = DEFAULT_SEARCH_K,
-        min_score: float = 0.1
+        min_score: float = 0.1,
+        mask: Optional[np.ndarray] = None
     ) -> List[Tuple[int, float, str]]:
         """
         Effectue une recherche sémantique.
@@ -110,6 +189,8 @@ class SemanticSearchEngine:
             query: Requête de recherche
             k: Nombre de résultats à retourner
             min_score: Score minimal requis
+            mask: Masque booléen des produits éligibles (aligné sur product_ids),
+                appliqué par FAISS pendant la recherche
             
         Returns:
             Liste de tuples (product_id, score, reason)
@@ -127,8 +208,29 @@ class SemanticSearchEngine:
         query_embedding = self.embedding_model.encode([processed_query])
         faiss.normalize_L2(query_embedding)
         
+        # Paramètres passés à chaque appel : l'index est partagé entre les
+        # requêtes concurrentes et n'est jamais modifié
+        search_options = {}
+        if mask is not None:
+            # Filtrage pendant le parcours de l'index : les k meilleurs éligibles
+            # directement, sans sur-échantillonnage puis filtrage a posteriori
+            allowed = np.flatnonzero(mask).astype('int64')
+            k = min(k, len(allowed))
+            if k == 0:
+                return []
+            search_options['sel'] = faiss.IDSelectorBatch(allowed)
+        
+        params = None
+        if hasattr(self.index, 'hnsw'):
+            # efSearch doit couvrir au moins k candidats (non sauvegardé avec l'index)
+            params = faiss.SearchParametersHNSW(
+                efSearch=max(FAISS_HNSW_EF_SEARCH, k), **search_options
+            )
+        elif search_options:
+            params = faiss.SearchParameters(**search_options)
+        
         # Rechercher dans l'index
-        scores, indices = self.index.search(query_embedding.astype('float32'), k)
+        scores, indices = self.index.search(query_embedding.astype('float32'), k, params=params)
         
         # Formater les résultats
         results = []
@@ -175,6 +277,11 @@ class SemanticSearchEngine:
         """
         Effectue une recherche avec filtres.
         
+        Les filtres sont évalués en un masque NumPy sur les attributs préchargés
+        (load_product_attributes) et appliqués par FAISS pendant la recherche.
+        Aucune requête en base : l'appelant charge les k produits retenus en une
+        requête, qui revérifie les filtres sur les données à jour.
+        
         Args:
             query: Requête de recherche
             k: Nombre de résultats à retourner
@@ -184,46 +291,30 @@ class SemanticSearchEngine:
             active_only: Si True, seulement les produits actifs
             
         Returns:
-            Liste de résultats filtrés
+            Liste de résultats filtrés, par score décroissant
         """
-        # Recherche initiale avec plus de résultats pour compenser le filtrage
-        initial_k = min(k * 3, MAX_SEARCH_K)
-        results = self.search(query, k=initial_k)
+        if self.category_ids_np is None:
+            # Attributs non préchargés : sur-échantillonner, l'appelant filtre en base
+            return self.search(query, k=min(k * 3, MAX_SEARCH_K))
         
-        if not results:
-            return results
-        
-        # Importer ici pour éviter les imports circulaires
-        from catalog.models import Product
-        
-        # Obtenir les IDs des produits
-        product_ids = [result[0] for result in results]
-        
-        # Construire le queryset avec filtres
-        queryset = Product.objects.filter(id__in=product_ids)
+        mask = np.ones(len(self.product_ids), dtype=bool)
         
         if active_only:
-            queryset = queryset.filter(is_active=True)
+            mask &= self.active_np
         
         if category_ids:
-            queryset = queryset.filter(category_id__in=category_ids)
+            mask &= np.isin(self.category_ids_np, category_ids)
         
+        # Comparaisons avec NaN (produit supprimé) toujours fausses
         if min_price is not None:
-            queryset = queryset.filter(price__gte=min_price)
+            mask &= self.prices_np >= min_price
         
         if max_price is not None:
-            queryset = queryset.filter(price__lte=max_price)
-        
-        # Obtenir les IDs filtrés
-        filtered_ids = set(queryset.values_list('id', flat=True))
-        
-        # Filtrer les résultats
-        filtered_results = [
-            result for result in results 
-            if result[0] in filtered_ids
-        ]
+            mask &= self.prices_np <= max_price
         
-        return filtered_results[:k]
+        # Marge pour les résultats écartés par la revérification en base
+        # (produits modifiés depuis le dernier rechargement des attributs)
+        return self.search(query, k=min(k * 2, MAX_SEARCH_K), mask=mask)
     
     def get_index_info(self) -> Dict[str, Any]:
         """
@@ -240,6 +331,6 @@ class SemanticSearchEngine:
             "total_vectors": self.index.ntotal,
             "dimension": self.index.d,
             "product_count": len(self.product_ids),
-            "index_type": "FAISS_IndexFlatIP",
+            "index_type": f"FAISS_{self.index_type}",
         }
 
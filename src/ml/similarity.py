@@ -2,11 +2,19 @@
 Calcul de similarité et recommandations basées contenu.
 """
 
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional
 import numpy as np
+import faiss
 from sklearn.metrics.pairwise import cosine_similarity
 
-from .config import DEFAULT_RECOMMENDATIONS_K, MAX_RECOMMENDATIONS_K
+from .config import (
+    DEFAULT_RECOMMENDATIONS_K,
+    MAX_RECOMMENDATIONS_K,
+    FAISS_HNSW_THRESHOLD,
+    FAISS_HNSW_M,
+    FAISS_HNSW_EF_CONSTRUCTION,
+    FAISS_HNSW_EF_SEARCH,
+)
 
 
 class SimilarityEngine:
@@ -14,6 +22,8 @@ class SimilarityEngine:
     
     def __init__(self):
         self.product_embeddings: np.ndarray = None
+        self.normalized_embeddings: np.ndarray = None
+        self.ann_index: Optional[faiss.Index] = None
         self.product_ids: List[int] = None
         self.id_to_index: Dict[int, int] = {}
     
@@ -28,6 +38,27 @@ class SimilarityEngine:
         self.product_embeddings = embeddings
         self.product_ids = product_ids
         
+        # Vecteurs unitaires : cosinus = simple produit scalaire. Les embeddings
+        # sauvegardés le sont déjà (float32 contigu, souvent en mmap) : pas de copie.
+        normalized = np.ascontiguousarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(normalized, axis=1, keepdims=True)
+        if not np.allclose(norms, 1.0, atol=1e-3):
+            normalized = normalized / np.maximum(norms, 1e-12)
+        self.normalized_embeddings = normalized
+        
+        # Grand catalogue : graphe HNSW (recherche sous-linéaire) sur vecteurs
+        # quantifiés 8 bits (4x moins de mémoire parcourue) ; en dessous, le
+        # produit matrice-vecteur exact reste plus rapide que l'index
+        self.ann_index = None
+        if len(product_ids) >= FAISS_HNSW_THRESHOLD:
+            self.ann_index = faiss.IndexHNSWSQ(
+                normalized.shape[1], faiss.ScalarQuantizer.QT_8bit, FAISS_HNSW_M,
+                faiss.METRIC_INNER_PRODUCT
+            )
+            self.ann_index.hnsw.efConstruction = FAISS_HNSW_EF_CONSTRUCTION
+            self.ann_index.train(normalized)
+            self.ann_index.add(normalized)
+        
         # Créer le mapping ID -> index
         self.id_to_index = {pid: idx for idx, pid in enumerate(product_ids)}
     
@@ -68,29 +99,67 @@ class SimilarityEngine:
         # Limiter k
         k = min(k, MAX_RECOMMENDATIONS_K)
         
-        # Calculer la matrice de similarité
-        similarity_matrix = self.cosine_similarity_matrix()
-        
         # Obtenir l'index du produit
         product_index = self.id_to_index[product_id]
         
-        # Obtenir les similarités pour ce produit
-        similarities = similarity_matrix[product_index]
+        if self.ann_index is not None:
+            return self._get_similar_products_ann(
+                product_id, product_index, k, exclude_self, min_similarity
+            )
+        
+        # Similarités de ce seul produit avec tous les autres : O(N·d) au lieu
+        # de la matrice complète O(N²·d)
+        similarities = self.normalized_embeddings @ self.normalized_embeddings[product_index]
+        if exclude_self:
+            similarities[product_index] = -np.inf
+        
+        # Top-k par sélection partielle, puis tri des seuls k retenus
+        if k < len(similarities):
+            top = np.argpartition(-similarities, k)[:k]
+        else:
+            top = np.arange(len(similarities))
+        top = top[np.argsort(-similarities[top], kind='stable')]
+        
+        # Formater les résultats au-dessus du seuil
+        recommendations = []
+        for idx in top:
+            similarity = float(similarities[idx])
+            if similarity < min_similarity:
+                break
+            pid = self.product_ids[idx]
+            reason = self._generate_reason(product_id, pid, similarity)
+            recommendations.append((pid, similarity, reason))
         
-        # Créer la liste des résultats avec indices
-        results = []
-        for idx, similarity in enumerate(similarities):
-            if similarity >= min_similarity:
-                if exclude_self and idx == product_index:
-                    continue
-                results.append((idx, similarity))
+        return recommendations
+    
+    def _get_similar_products_ann(
+        self,
+        product_id: int,
+        product_index: int,
+        k: int,
+        exclude_self: bool,
+        min_similarity: float
+    ) -> List[Tuple[int, float, str]]:
+        """
+        Variante de get_similar_products via l'index HNSW (résultats approchés).
         
-        # Trier par similarité décroissante
-        results.sort(key=lambda x: x[1], reverse=True)
+        Returns:
+            Liste de tuples (product_id, similarity_score, reason)
+        """
+        # Un voisin de plus : le produit lui-même est en général le premier résultat
+        search_k = k + 1 if exclude_self else k
+        query = self.normalized_embeddings[product_index:product_index + 1]
+        # efSearch passé à l'appel : l'index partagé entre requêtes n'est pas modifié
+        params = faiss.SearchParametersHNSW(efSearch=max(FAISS_HNSW_EF_SEARCH, search_k))
+        scores, indices = self.ann_index.search(query, search_k, params=params)
         
-        # Prendre les k premiers et formater
         recommendations = []
-        for idx, similarity in results[:k]:
+        for similarity, idx in zip(scores[0], indices[0]):
+            if idx == -1 or (exclude_self and idx == product_index):
+                continue
+            similarity = float(similarity)
+            if similarity < min_similarity or len(recommendations) == k:
+                break
             pid = self.product_ids[idx]
             reason = self._generate_reason(product_id, pid, similarity)
             recommendations.append((pid, similarity, reason))
@@ -148,51 +217,35 @@ class SimilarityEngine:
         if not candidates:
             return []
         
-        # MMR simple
-        selected = []
-        remaining = candidates.copy()
+        # MMR vectorisé : similarités candidat-candidat calculées une seule fois
+        candidate_vectors = self.normalized_embeddings[
+            [self.id_to_index[pid] for pid, _, _ in candidates]
+        ]
+        pairwise = candidate_vectors @ candidate_vectors.T
+        relevance = np.array([score for _, score, _ in candidates], dtype=np.float32)
         
         # Prendre le premier (le plus similaire)
-        if remaining:
-            selected.append(remaining.pop(0))
+        selected = [0]
+        available = np.ones(len(candidates), dtype=bool)
+        available[0] = False
+        # Similarité maximale de chaque candidat aux produits déjà sélectionnés
+        max_similarity = pairwise[0].copy()
         
         # Sélectionner les suivants avec diversité
-        while len(selected) < k and remaining:
-            best_candidate = None
-            best_score = -1
-            
-            for candidate in remaining:
-                # Score de similarité
-                similarity_score = candidate[1]
-                
-                # Score de diversité (distance minimale aux sélectionnés)
-                diversity_score = 0
-                if selected:
-                    min_distance = min(
-                        1 - self._get_similarity_between_products(
-                            candidate[0], sel[0]
-                        )
-                        for sel in selected
-                    )
-                    diversity_score = min_distance
-                
-                # Score combiné
-                combined_score = (
-                    (1 - diversity_weight) * similarity_score + 
-                    diversity_weight * diversity_score
-                )
-                
-                if combined_score > best_score:
-                    best_score = combined_score
-                    best_candidate = candidate
+        while len(selected) < k and available.any():
+            # Diversité = distance minimale aux sélectionnés = 1 - similarité maximale
+            combined = (
+                (1 - diversity_weight) * relevance +
+                diversity_weight * (1 - max_similarity)
+            )
+            combined[~available] = -np.inf
+            best = int(np.argmax(combined))
             
-            if best_candidate:
-                selected.append(best_candidate)
-                remaining.remove(best_candidate)
-            else:
-                break
+            selected.append(best)
+            available[best] = False
+            np.maximum(max_similarity, pairwise[best], out=max_similarity)
         
-        return selected
+        return [candidates[i] for i in selected]
     
     def _get_similarity_between_products(self, product_id1: int, product_id2: int) -> float:
         """
@@ -212,8 +265,7 @@ class SimilarityEngine:
         idx1 = self.id_to_index[product_id1]
         idx2 = self.id_to_index[product_id2]
         
-        similarity_matrix = self.cosine_similarity_matrix()
-        return similarity_matrix[idx1, idx2]
+        return float(self.normalized_embeddings[idx1] @ self.normalized_embeddings[idx2])
     
     def batch_similarity(self, product_ids: List[int]) -> Dict[int, List[Tuple[int, float, str]]]:
         """
@@ -2,6 +2,7 @@
 Vectorisation des produits pour les recommandations et la recherche.
 """
 
+import logging
 import pickle
 from typing import List, Optional, Tuple
 
@@ -13,10 +14,17 @@ from sentence_transformers import SentenceTransformer
 from .config import (
     EMBEDDING_MODEL,
     EMBEDDING_DIMENSION,
+    EMBEDDING_BATCH_SIZE,
+    PRODUCT_CHUNK_SIZE,
     TFIDF_MODEL_PATH,
     PRODUCT_EMBEDDINGS_PATH,
 )
-from .preprocessing import create_product_text
+from .preprocessing import build_product_text, create_product_text
+
+logger = logging.getLogger(__name__)
+
+# Colonnes attendues par ProductVectorizer.prepare_rows (ordre de values_list)
+PRODUCT_TEXT_FIELDS = ('id', 'name', 'description', 'category__name')
 
 
 class ProductVectorizer:
@@ -38,34 +46,56 @@ class ProductVectorizer:
         # Charger le modèle d'embeddings
         try:
             self.embedding_model = SentenceTransformer(EMBEDDING_MODEL)
-        except Exception as e:
-            print(f"Erreur lors du chargement du modèle d'embeddings: {e}")
+        except Exception:
+            logger.exception("Erreur lors du chargement du modèle d'embeddings")
             self.embedding_model = None
     
     def prepare_data(self, products):
         """
         Prépare les données des produits pour la vectorisation.
         
+        Les QuerySets sont parcourus par lots (iterator) : seuls les textes sont
+        conservés en mémoire, pas les instances de modèles.
+        
         Args:
             products: QuerySet des produits
         """
         self.product_ids = []
         self.product_texts = []
         
+        if hasattr(products, 'iterator'):
+            products = products.iterator(chunk_size=PRODUCT_CHUNK_SIZE)
+        
         for product in products:
             if product.is_active:  # Seulement les produits actifs
                 self.product_ids.append(product.id)
                 text = create_product_text(product)
                 self.product_texts.append(text)
     
-    def fit_tfidf(self, products):
+    def prepare_rows(self, rows):
+        """
+        Prépare les données à partir de lignes déjà chargées.
+        
+        Args:
+            rows: Tuples (id, name, description, category_name) des produits actifs,
+                issus de values_list(*PRODUCT_TEXT_FIELDS)
+        """
+        self.product_ids = []
+        self.product_texts = []
+        
+        for product_id, name, description, category_name in rows:
+            self.product_ids.append(product_id)
+            self.product_texts.append(build_product_text(name, category_name, description))
+    
+    def fit_tfidf(self, products=None):
         """
         Entraîne le modèle TF-IDF sur les produits.
         
         Args:
-            products: QuerySet des produits
+            products: QuerySet des produits (optionnel, utilise les données préparées si None)
         """
-        self.prepare_data(products)
+        if products is not None:
+            self.prepare_data(products)
         
         if not self.product_texts:
             raise ValueError("Aucun texte de produit disponible")
@@ -126,12 +156,18 @@ class ProductVectorizer:
         if not self.product_texts:
             raise ValueError("Aucun texte de produit disponible")
         
-        # Générer les embeddings
-        embeddings = self.embedding_model.encode(
-            self.product_texts,
-            show_progress_bar=True,
-            convert_to_numpy=True
+        # Générer les embeddings par lots dans une matrice préallouée
+        embeddings = np.empty(
+            (len(self.product_texts), EMBEDDING_DIMENSION), dtype=np.float32
         )
+        for start in range(0, len(self.product_texts), PRODUCT_CHUNK_SIZE):
+            chunk = self.product_texts[start:start + PRODUCT_CHUNK_SIZE]
+            embeddings[start:start + len(chunk)] = self.embedding_model.encode(
+                chunk,
+                batch_size=EMBEDDING_BATCH_SIZE,
+                show_progress_bar=False,
+                convert_to_numpy=True
+            )
         
         return embeddings
     
@@ -139,10 +175,16 @@ class ProductVectorizer:
         """
         Sauvegarde les embeddings des produits.
         
+        Stockés normalisés en float32 contigu : le fichier est directement
+        utilisable en mmap (aucune conversion au chargement), donc partagé
+        entre workers via le cache de pages de l'OS.
+        
         Args:
             embeddings: Matrice des embeddings
         """
-        np.save(PRODUCT_EMBEDDINGS_PATH, embeddings)
+        normalized = np.ascontiguousarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(normalized, axis=1, keepdims=True)
+        np.save(PRODUCT_EMBEDDINGS_PATH, normalized / np.maximum(norms, 1e-12))
         
         # Sauvegarder aussi les IDs des produits
         ids_path = PRODUCT_EMBEDDINGS_PATH.with_suffix('.ids.pkl')
@@ -159,7 +201,11 @@ class ProductVectorizer:
         if not PRODUCT_EMBEDDINGS_PATH.exists():
             raise FileNotFoundError("Embeddings non trouvés")
         
-        embeddings = np.load(PRODUCT_EMBEDDINGS_PATH)
+        # Projection mémoire en lecture seule : une seule copie physique par machine
+        embeddings = np.load(PRODUCT_EMBEDDINGS_PATH, mmap_mode='r')
+        if embeddings.dtype != np.float32:
+            # Anciens fichiers float16 : les calculs (sklearn, FAISS) se font en float32
+            embeddings = embeddings.astype(np.float32)
         
         # Charger les IDs des produits
         ids_path = PRODUCT_EMBEDDINGS_PATH.with_suffix('.ids.pkl')
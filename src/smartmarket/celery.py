@@ -29,6 +29,7 @@ app.conf.update(
         'catalog.tasks.send_order_email': {'queue': 'emails'},
         'catalog.tasks.purge_cache': {'queue': 'maintenance'},
         'catalog.tasks.generate_report': {'queue': 'reports'},
+        'catalog.tasks.refresh_admin_stats': {'queue': 'maintenance'},
     },
     
     # Configuration des workers
@@ -85,6 +86,14 @@ app.conf.beat_schedule = {
             'expires': 60,
         }
     },
+    'refresh-admin-stats': {
+        'task': 'catalog.tasks.refresh_admin_stats',
+        'schedule': 10.0,  # Toutes les 10 secondes
+        'options': {
+            'queue': 'maintenance',
+            'expires': 10,
+        }
+    },
     'daily-report': {
         'task': 'catalog.tasks.generate_daily_report',
         'schedule': 86400.0,  # Tous les jours à minuit
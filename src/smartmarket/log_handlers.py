@@ -0,0 +1,55 @@
+"""
+Handlers de logging asynchrones pour SmartMarket.
+
+Le thread qui journalise se contente de formater l'enregistrement et de le
+déposer dans une file : l'écriture (stdout, fichier) est faite par un thread
+QueueListener dédié, hors du chemin des requêtes.
+"""
+
+import atexit
+import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+
+class _QueuedHandler(QueueHandler):
+    """QueueHandler qui possède son propre QueueListener et son handler cible."""
+
+    def __init__(self, target: logging.Handler):
+        super().__init__(queue.SimpleQueue())
+        # Message déjà formaté par prepare() : la cible l'écrit tel quel
+        self.target = target
+        self.listener = None
+        self._start_listener()
+
+        # Les threads ne survivent pas au fork (workers gunicorn/celery)
+        os.register_at_fork(after_in_child=self._start_listener)
+        atexit.register(self._stop_listener)
+
+    def _start_listener(self):
+        """Démarre le thread d'écriture."""
+        self.listener = QueueListener(self.queue, self.target)
+        self.listener.start()
+
+    def _stop_listener(self):
+        """Vide la file et arrête le thread d'écriture."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+
+class QueuedStreamHandler(_QueuedHandler):
+    """Équivalent de logging.StreamHandler, écriture en arrière-plan."""
+
+    def __init__(self, stream=None):
+        super().__init__(logging.StreamHandler(stream))
+
+
+class QueuedRotatingFileHandler(_QueuedHandler):
+    """Équivalent de RotatingFileHandler, écriture en arrière-plan."""
+
+    def __init__(self, filename, maxBytes=0, backupCount=0, encoding=None):
+        super().__init__(RotatingFileHandler(
+            filename, maxBytes=maxBytes, backupCount=backupCount, encoding=encoding
+        ))
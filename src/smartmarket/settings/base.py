@@ -127,7 +127,7 @@ REST_FRAMEWORK = {
     },
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
     "DEFAULT_RENDERER_CLASSES": [
-        "rest_framework.renderers.JSONRenderer",
+        "catalog.renderers.ORJSONRenderer",
     ],
     "DEFAULT_PARSER_CLASSES": [
         "rest_framework.parsers.JSONParser",
@@ -169,6 +169,13 @@ ML_PERFORMANCE_CONFIG = {
     "CACHE_TTL": 3600,  # 1 heure
 }
 
+# Charge les modèles ML au démarrage du processus plutôt qu'à la première requête
+ML_WARMUP_ON_STARTUP = os.getenv('ML_WARMUP_ON_STARTUP', 'False').lower() == 'true'
+
+# Vue asynchrone de l'assistant RAG : uniquement sous ASGI (uvicorn/daphne),
+# sous WSGI (gunicorn) la vue DRF synchrone est conservée
+ML_RAG_ASYNC = os.getenv('ML_RAG_ASYNC', 'False').lower() == 'true'
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -182,13 +189,14 @@ LOGGING = {
             "style": "%",
         },
     },
+    # Écriture déportée dans un thread (QueueHandler -> QueueListener)
     "handlers": {
         "console": {
-            "class": "logging.StreamHandler",
+            "class": "smartmarket.log_handlers.QueuedStreamHandler",
             "formatter": "verbose",
         },
         "json_console": {
-            "class": "logging.StreamHandler",
+            "class": "smartmarket.log_handlers.QueuedStreamHandler",
             "formatter": "json",
         },
     },
@@ -213,6 +221,10 @@ LOGGING = {
 # Configuration Celery
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/1')
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/1')
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'socket_keepalive': True,  # Réutilise la connexion au broker entre les envois
+    'health_check_interval': 30,
+}
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
@@ -246,6 +258,9 @@ CHANNEL_LAYERS = {
             )],
             "capacity": 1500,
             "expiry": 10,
+            # Enveloppes en msgpack (format par défaut de channels-redis) : les
+            # trames pré-encodées par consumers.serialize_frames contiennent des
+            # octets, qu'un sérialiseur JSON ne transporte pas
         },
     },
 }
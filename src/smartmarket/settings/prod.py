@@ -63,13 +63,14 @@ LOGGING = {
             'style': '{',
         },
     },
+    # Écriture déportée dans un thread (QueueHandler -> QueueListener)
     'handlers': {
         'console': {
-            'class': 'logging.StreamHandler',
+            'class': 'smartmarket.log_handlers.QueuedStreamHandler',
             'formatter': 'json',
         },
         'file': {
-            'class': 'logging.handlers.RotatingFileHandler',
+            'class': 'smartmarket.log_handlers.QueuedRotatingFileHandler',
             'filename': '/app/logs/django.log',
             'maxBytes': 1024*1024*15,  # 15MB
             'backupCount': 10,